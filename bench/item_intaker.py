@@ -0,0 +1,102 @@
+import time
+from typing import Optional
+
+import typer
+from tiktoken import get_encoding
+
+from src.ai.discourse.discourse import CommunicationRole, DiscourseFeatures, DiscourseMember, DiscourseType, Person
+from src.ai.discourse.ingestor import BackingDiscourseChunkIngestor, DiscourseIngestor
+from src.ai.discourse.item_intaker import ItemIntaker
+from src.Bible.index_settings import indexSettings
+from src.Bible.usfm import read_Bible
+from src.models.item import Item
+from src.models.item_ref import ItemRef
+from src.publications.publication_items import PublicationItemsIndexer
+from src.services.item_bulk import flatten_item_tree
+
+from bench.usfm import DIRECTORY, SKIP, book_filenames
+
+DEFAULT_BOOK = "20-PSAeng-asv.usfm"
+
+class ReencodingItemIntaker(ItemIntaker):
+    """Counts tokens as ItemIntaker did before it kept a running count, by encoding the whole chunk on every add
+
+    The chunk is encoded as it will be joined, with the space before the new
+    text, so that both intakers split books into the same chunks.
+    """
+    def add_to_current_chunk(self, text: Optional[str], communicator: DiscourseMember, ref: ItemRef):
+        if (self.current_chunk is not None and
+            text is not None and len(self.token_enc.encode(self.current_chunk.text + " " + text)) >= self.chunk_token_limit):
+            self.finish_current_chunk()
+
+        if self.current_chunk is None:
+            self.start_new_chunk(communicator=communicator, ref=ref)
+        elif self.current_index.extend(ref) == False:
+            self.start_new_chunk(communicator=communicator, ref=ref)
+
+        if text is not None:
+            if len(self.current_chunk.text) == 0:
+                self.current_chunk.text = text
+            else:
+                self.current_chunk.text += " " + text
+
+    def finish_current_chunk(self):
+        # The chunk's text is built in place, not by a ChunkTextBuilder
+        self.current_chunk.index = self.current_index.to_string()
+        self.discourse_ingestor.ingest(self.current_chunk)
+        self.current_chunk = None
+        self.current_index = None
+
+def read_book(filename: str) -> tuple[Item, int]:
+    """Reads a book into unsaved Items, numbered in memory as if they were saved, returning it and how many Items it has"""
+    Bible = read_Bible(DIRECTORY, None, "ASV", skip=SKIP + [other for other in book_filenames(DIRECTORY) if other != filename])
+    book = Bible.children[0].child
+    items, _ = flatten_item_tree(book)
+    for index, item in enumerate(items):
+        item.id = index + 1
+    return book, len(items)
+
+def intake(intaker_class: type[ItemIntaker], book: Item, encoding: str, chunk_token_limit: int) -> tuple[float, list[str]]:
+    """Ingests a book, returning how long it took and the text of its chunks"""
+    features = DiscourseFeatures(types=[DiscourseType.BOOK], members=[DiscourseMember(roles=[CommunicationRole.WRITER], person=Person(name="writer", desc="writer of the book"))])
+    backing = BackingDiscourseChunkIngestor(features=features, new_chunk_receiver=None)
+    indexer = PublicationItemsIndexer(settings=indexSettings)
+    # The book isn't saved, so its name can't be looked up
+    indexer.names[book.id] = book.text
+    intaker = intaker_class(
+        item_indexer=indexer,
+        discourse_ingestor=DiscourseIngestor(discourse_features=features, ingestors=[backing]),
+        chunk_token_limit=chunk_token_limit,
+        token_enc=get_encoding(encoding),
+    )
+    start = time.perf_counter()
+    intaker.intake(book, ItemRef(root=book.id))
+    return time.perf_counter() - start, [chunk.text for chunk in backing.discourse.chunks]
+
+app = typer.Typer()
+
+@app.command()
+def main(
+        book: str = typer.Option(DEFAULT_BOOK, help=f"Book file in {DIRECTORY}"),
+        encoding: str = "cl100k_base",
+        chunk_token_limit: int = 1024,
+        repeat: int = 3,
+    ):
+    """Times ingesting a whole book into chunks, counting tokens incrementally and by re-encoding each chunk"""
+    item, items = read_book(book)
+    print(f"{book}: {items} items, chunks of up to {chunk_token_limit} tokens")
+
+    results = {} # type: dict[str, tuple[float, list[str]]]
+    for name, intaker_class in [("re-encoding", ReencodingItemIntaker), ("incremental", ItemIntaker)]:
+        runs = [intake(intaker_class, item, encoding, chunk_token_limit) for _ in range(repeat)]
+        results[name] = min(runs, key=lambda run: run[0])
+        seconds, chunks = results[name]
+        print(f"{name}: {seconds:.3f}s, {len(chunks)} chunks")
+
+    print(f"Speedup: {results['re-encoding'][0] / results['incremental'][0]:.1f}x")
+    if results["re-encoding"][1] != results["incremental"][1]:
+        print("The chunks differ")
+        raise typer.Exit(code=1)
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,198 @@
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import typer
+
+from src.Bible.usfm import read_Bible, read_USFM_file
+
+DIRECTORY = "content/Bible/ASV"
+SKIP = ["00-FRTeng-asv.usfm", "01-INTeng-asv.usfm"]
+DEFAULT_BASELINE = os.path.join("bench", "baseline.json")
+DEFAULT_TOLERANCE = 0.10
+
+def book_filenames(directory: str) -> list[str]:
+    return sorted(
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".usfm") and filename not in SKIP
+    )
+
+def count_markers(contents) -> int:
+    """Counts the markers (including plain text) of `USFMMarkerContents` or `USFMNodeView`s"""
+    count = 0
+    for content in contents:
+        count += 1
+        descendants = content.descendants
+        if descendants is not None:
+            count += count_markers(descendants)
+    return count
+
+def peak_rss_MB() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def bench_read_Bible_USFM(directory: str, compact: bool) -> dict:
+    """Parses each book as `read_Bible_USFM` does with one worker, timing each book"""
+    books = {} # type: dict[str, float]
+    markers = 0
+
+    for filename in book_filenames(directory):
+        start = time.perf_counter()
+        file = read_USFM_file(directory, filename, compact=compact)
+        books[filename] = time.perf_counter() - start
+        markers += count_markers(file.contents)
+
+    return { "seconds": sum(books.values()), "markers": markers, "books": books, "peak_rss_MB": peak_rss_MB() }
+
+def bench_read_Bible(directory: str, compact: bool) -> dict:
+    """Parses every book and builds its Items, as the import does before saving them"""
+    start = time.perf_counter()
+    read_Bible(directory, None, "ASV", skip=SKIP, compact=compact)
+    return { "seconds": time.perf_counter() - start, "peak_rss_MB": peak_rss_MB() }
+
+BENCHMARKS = {
+    "read_Bible_USFM": lambda directory: bench_read_Bible_USFM(directory, compact=False),
+    "read_Bible_USFM compact": lambda directory: bench_read_Bible_USFM(directory, compact=True),
+    "read_Bible": lambda directory: bench_read_Bible(directory, compact=False),
+    "read_Bible compact": lambda directory: bench_read_Bible(directory, compact=True),
+} # type: dict[str, Callable[[str], dict]]
+
+def run_benchmark(name: str, directory: str) -> dict:
+    return BENCHMARKS[name](directory)
+
+def run_isolated(name: str, directory: str) -> dict:
+    """Runs a benchmark in a fresh process, so that its peak RSS is its own"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_benchmark, name, directory).result()
+
+def run_suite(directory: str, repeat: int, names: Optional[list[str]] = None) -> dict:
+    filenames = book_filenames(directory)
+    corpus_bytes = sum(os.path.getsize(os.path.join(directory, filename)) for filename in filenames)
+
+    benchmarks = {} # type: dict[str, dict]
+    for name in (names or list(BENCHMARKS)):
+        # The fastest of the repeats is the least disturbed by the rest of the machine
+        runs = [run_isolated(name, directory) for _ in range(repeat)]
+        result = min(runs, key=lambda run: run["seconds"])
+        result["MB_per_s"] = corpus_bytes / 1e6 / result["seconds"]
+        if "markers" in result:
+            result["markers_per_s"] = result["markers"] / result["seconds"]
+        result["peak_rss_MB"] = max(run["peak_rss_MB"] for run in runs)
+        benchmarks[name] = result
+
+        print(format_result(name, result))
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+            "python": sys.version.split()[0],
+        },
+        "corpus": {
+            "directory": directory,
+            "books": len(filenames),
+            "bytes": corpus_bytes,
+        },
+        "repeat": repeat,
+        "benchmarks": benchmarks,
+    }
+
+def format_result(name: str, result: dict) -> str:
+    line = f"{name}: {result['seconds']:.2f}s, {result['MB_per_s']:.2f} MB/s"
+    if "markers_per_s" in result:
+        line += f", {result['markers_per_s']:,.0f} markers/s"
+    return line + f", {result['peak_rss_MB']:.0f} MB peak RSS"
+
+def compare_results(baseline: dict, results: dict, tolerance: float) -> list[str]:
+    """Prints how `results` compare to `baseline`, returning the regressions beyond `tolerance`"""
+    regressions = [] # type: list[str]
+
+    def check(label: str, expected: float, actual: float):
+        change = actual / expected - 1
+        marker = ""
+        if change > tolerance:
+            regressions.append(f"{label}: {expected:.2f} -> {actual:.2f} (+{change:.0%})")
+            marker = " REGRESSION"
+        print(f"  {label}: {expected:.2f} -> {actual:.2f} ({change:+.0%}){marker}")
+
+    for name, result in results["benchmarks"].items():
+        expected = baseline["benchmarks"].get(name)
+        if expected is None:
+            print(f"{name}: not in baseline")
+            continue
+
+        print(f"{name}:")
+        check("seconds", expected["seconds"], result["seconds"])
+        check("peak RSS MB", expected["peak_rss_MB"], result["peak_rss_MB"])
+
+        for filename, seconds in result.get("books", {}).items():
+            expected_seconds = expected.get("books", {}).get(filename)
+            # Individual books are too short to compare reliably on their own
+            if expected_seconds is not None and expected_seconds >= 0.1:
+                check(filename, expected_seconds, seconds)
+
+    return regressions
+
+def load_results(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def save_results(path: str, results: dict):
+    directory = os.path.dirname(path)
+    if directory != "":
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+        file.write("\n")
+
+app = typer.Typer()
+
+@app.command()
+def run(
+        directory: str = DIRECTORY,
+        output: Optional[str] = None,
+        baseline: str = DEFAULT_BASELINE,
+        save_baseline: bool = False,
+        repeat: int = 1,
+        tolerance: float = DEFAULT_TOLERANCE,
+        benchmark: Optional[list[str]] = None,
+    ):
+    """Runs the USFM benchmarks, optionally saving the results, and compares them to the baseline"""
+    for name in (benchmark or []):
+        if name not in BENCHMARKS:
+            raise typer.BadParameter(f"unknown benchmark {name!r}, expected one of {', '.join(BENCHMARKS)}")
+
+    results = run_suite(directory, repeat, benchmark)
+
+    if output is not None:
+        save_results(output, results)
+        print(f"Saved results to {output}")
+
+    if save_baseline:
+        save_results(baseline, results)
+        print(f"Saved baseline to {baseline}")
+    elif os.path.exists(baseline):
+        regressions = compare_results(load_results(baseline), results, tolerance)
+        if len(regressions) > 0:
+            print(f"{len(regressions)} regressions beyond {tolerance:.0%}")
+            raise typer.Exit(code=1)
+
+@app.command()
+def compare(results: str, baseline: str = DEFAULT_BASELINE, tolerance: float = DEFAULT_TOLERANCE):
+    """Compares saved results to the baseline"""
+    regressions = compare_results(load_results(baseline), load_results(results), tolerance)
+    if len(regressions) > 0:
+        print(f"{len(regressions)} regressions beyond {tolerance:.0%}")
+        raise typer.Exit(code=1)
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,42 @@
+import gc
+import os
+import time
+import tracemalloc
+
+from src.Bible.usfm import USFMNodeStore, USFMParser
+
+DIRECTORY = "content/Bible/ASV"
+SKIP = ["00-FRTeng-asv.usfm", "01-INTeng-asv.usfm"]
+
+def measure(name: str, parse) -> int:
+    """Parses every book with `parse` and reports the memory the results keep"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    results = []
+    for filename in sorted(os.listdir(DIRECTORY)):
+        if not filename.endswith(".usfm") or filename in SKIP:
+            continue
+        with open(os.path.join(DIRECTORY, filename), 'r', encoding='utf-8') as file:
+            text = file.read()
+        results.append(parse(text))
+        del text
+
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name}: {size / 1e6:.1f} MB kept, {peak / 1e6:.1f} MB peak, {time.perf_counter() - start:.1f}s (traced)")
+    return size
+
+def main():
+    parser = USFMParser()
+
+    tree = measure("USFMMarkerContents tree", parser.parse)
+    store = measure("USFMNodeStore", lambda text: USFMNodeStore.from_events(parser.events(text)))
+
+    print(f"saved {(tree - store) / 1e6:.1f} MB ({tree / store:.1f}x smaller)")
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import io
 from sqlmodel import SQLModel, Session
 from src.db.database import get_session, engine, init_db
 from src.models import Item, ItemChildrenDisplayClass, ItemChild
+from src.services.item_bulk import bulk_insert_item_tree
 
 from dataclasses import dataclass
 from typing import List, Callable, Iterable
@@ -58,30 +59,23 @@ def load_KJ(session: Session):
                     local_index_verse = 0
                     for verse in paragraph.verses:
                         verse_note = Item(text=verse.text)
-                        session.add(verse_note)
                         child_verses.append(ItemChild(local_index=local_index_verse, label=f"{verse.index}", child=verse_note))
                         local_index_verse += 1
 
-                    item_paragraph = Item(child_display_class=ItemChildrenDisplayClass.INLINE, children=child_verses)
-                    session.add(item_paragraph)
+                    item_paragraph = Item(children_display_class=ItemChildrenDisplayClass.INLINE, children=child_verses)
                     child_paragraphs.append(ItemChild(local_index=local_index_paragraph, child=item_paragraph))
                     local_index_paragraph += 1
 
-                item_chapter = Item(child_display_class=ItemChildrenDisplayClass.BLOCK, children=child_paragraphs)
-                session.add(item_chapter)
+                item_chapter = Item(children_display_class=ItemChildrenDisplayClass.BLOCK, children=child_paragraphs)
                 child_chapters.append(ItemChild(local_index=local_index_chapter, label=f"{chapter.index}", child=item_chapter))
                 local_index_chapter += 1
 
-            item_book = Item(text=book.title, child_display_class=ItemChildrenDisplayClass.PAGINATION, children=child_chapters)
-            session.add(item_book)
-            session.commit()
-            child_books.append(ItemChild(local_index=local_index_book, local_label=book.title, child=item_book))
+            item_book = Item(text=book.title, children_display_class=ItemChildrenDisplayClass.PAGINATION, children=child_chapters)
+            child_books.append(ItemChild(local_index=local_index_book, label=book.title, child=item_book))
             local_index_book += 1
 
-        Bible = Item(text=f"Bible ({rendering})", child_display_class=ItemChildrenDisplayClass.ACCORDION, children=child_books)
-        session.add(Bible)
-        session.commit()
-        # session.refresh(Bible)
+        Bible = Item(text=f"Bible ({rendering})", children_display_class=ItemChildrenDisplayClass.ACCORDION, children=child_books)
+        print(f"Saved {bulk_insert_item_tree(session, Bible)}")
         return Bible
 
     # This generator function yields paragraphs formatted from unformatted verses
@@ -0,0 +1,21 @@
+from src.publications.publication_items import PublicationIndexFormatSettings, PublicationIndexReferenceSettings, PublicationIndexSettings
+
+# How Bible references are written, e.g. "Genesis 1:3"
+indexSettings = PublicationIndexSettings(
+    format_settings=PublicationIndexFormatSettings(
+        chapters_main_multiple=True,
+        chapters_intro=[],
+        chapters_conclusion=[],
+        subchapters_main_multiple=True,
+        subchapters_intro=["superscript"],
+        subchapters_conclusion=[],
+        format_chapter_main_entire_singular="{chapter}",
+        format_chapter_main_entire_plural="{chapters}",
+        format_chapter_partial="{chapter}",
+        format_subchapter_main_singular="{subchapter}",
+        format_subchapter_main_plural="{subchapters}",
+        format_range_through_chapters="{chapter_subchapter_start}-{chapter_subchapter_end}",
+        format_chapter_subchapter="{chapter}:{subchapter}",
+    ),
+    reference_settings=PublicationIndexReferenceSettings()
+)
@@ -5,27 +5,9 @@ from src.ai.discourse.ingestor import BackingDiscourseChunkIngestor, DiscourseCh
 from src.ai.discourse.item_intaker import ItemIntaker
 from src.models.item import Item
 from src.models.item_ref import ItemRef
-from src.publications.publication_items import PublicationIndexFormatSettings, PublicationIndexReferenceSettings, PublicationIndexSettings, PublicationItemsIndexer
-from src.services.item import get_items
-
-indexSettings = PublicationIndexSettings(
-    format_settings=PublicationIndexFormatSettings(
-        chapters_main_multiple=True,
-        chapters_intro=[],
-        chapters_conclusion=[],
-        subchapters_main_multiple=True,
-        subchapters_intro=["superscript"],
-        subchapters_conclusion=[],
-        format_chapter_main_entire_singular="{chapter}",
-        format_chapter_main_entire_plural="{chapters}",
-        format_chapter_partial="{chapter}",
-        format_subchapter_main_singular="{subchapter}",
-        format_subchapter_main_plural="{subchapters}",
-        format_range_through_chapters="{chapter_subchapter_start}-{chapter_subchapter_end}",
-        format_chapter_subchapter="{chapter}:{subchapter}",
-    ),
-    reference_settings=PublicationIndexReferenceSettings()
-)
+from src.Bible.index_settings import indexSettings
+from src.publications.publication_items import PublicationItemsIndexer
+from src.services.item import get_items, load_item_subtree
 
 def readBible(Bible: Item, session: Session):
     class GuessDiscourseFeatures(Signature):
@@ -36,7 +18,7 @@ def readBible(Bible: Item, session: Session):
     guess_features = TypedPredictor(GuessDiscourseFeatures)
 
     for book in Bible.children:
-        name = next(get_items(ItemRef(root=book.child_id, path=indexSettings.reference_settings.name_path), session)).text
+        name = next(get_items(ItemRef(root=book.child_id, path=indexSettings.reference_settings.name_path), session, columns=[Item.text])).text
         print(name)
 
         features = guess_features(book=name).features
@@ -55,7 +37,7 @@ def readBible(Bible: Item, session: Session):
         )
 
 
-        intaker.intake(book.child, ItemRef(root=book.child_id))
+        intaker.intake(load_item_subtree(session, book.child_id), ItemRef(root=book.child_id))
 
         for chunk in backing.discourse.chunks:
             print(chunk.index)
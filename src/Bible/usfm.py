@@ -1,11 +1,42 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from enum import Enum
 import os
-from typing import Optional, Union
+import re
+import struct
+from typing import TYPE_CHECKING, Callable, Generator, Iterable, Optional, Union
 
 from sqlmodel import Session
 
 from src.models.item import Item, ItemChild, ItemChildrenDisplayClass
 
+if TYPE_CHECKING:
+    from src.Bible.usfm_cache import USFMParseCache
+
+_WHITESPACE = re.compile(r'\s*')
+_MARKER = re.compile(r'\\(\+?)([^\s\d]*)')
+
+class USFMEventKind(Enum):
+    START = "start"
+    TEXT = "text"
+    ATTRIBUTE = "attribute"
+    END = "end"
+
+@dataclass
+class USFMEvent:
+    """A marker starting or ending, plain text, or an attribute (`name`=`text`) of the marker about to end
+
+    Events walked with `spans` leave `text` as None and give its `span` of the source instead.
+    """
+    kind: USFMEventKind
+    name: Optional[str] = None
+    level: Optional[int] = None
+    number: Optional[int] = None
+    nested: bool = False
+    text: Optional[str] = None
+    span: Optional[tuple[int, int]] = None
+
 class USFMMarkerContents:
     name: Optional[str] = None
     level: Optional[int] = None
@@ -14,6 +45,8 @@ class USFMMarkerContents:
     nested: bool = False
     descendants: Optional[list["USFMMarkerContents"]] = None
     attributes: Optional[dict[str, str]] = None
+    text_span: Optional[tuple[int, int]] = None
+    attribute_spans: Optional[dict[str, tuple[int, int]]] = None
 
 class Option(Enum):
     off = "off"
@@ -42,20 +75,14 @@ class USFMMarkerFormat:
         self.numbered = numbered
         self.nested = nested
         self.may_contains = may_contain
+        self.closing_markers = (f"\\{name}*", f"\\+{name}*") if name is not None else None
 
     def parse(self, text: str, start: int, formats: dict[str, dict[str | None, "USFMMarkerFormat"]]) -> tuple[USFMMarkerContents, int] | None:
         if start == len(text):
             return None
 
-        contents = USFMMarkerContents()
-
-        def skip_whitespace():
-            nonlocal start
-            while start < len(text) and text[start].isspace():
-                start += 1
-
-        opening_marker = None # type: Optional[str]
         start_marker = start
+        nested = False
 
         if self.name is not None:
             if text[start] != '\\':
@@ -65,12 +92,8 @@ class USFMMarkerFormat:
             if text[start] == '+':
                 if self.nested == Option.off:
                     return None
-                contents.nested = True
+                nested = True
                 start += 1
-            
-            if contents.nested == Option.required:
-                if contents.nested == False:
-                    return None
 
             if not text.startswith(self.name, start):
                 return None
@@ -79,6 +102,86 @@ class USFMMarkerFormat:
             if not (len(text) == start or (text[start].isspace() or text[start].isdigit())):
                 return None
 
+        def parse_descendants(contents: USFMMarkerContents, start: int) -> int:
+            return self.parse_descendants_by_trial(text, start, contents, formats=formats)
+
+        return self.parse_opened(text, start_marker, start, nested, parse_descendants)
+
+    def parse_descendants_by_trial(self, text: str, start: int, contents: USFMMarkerContents, formats: dict[str, dict[str | None, "USFMMarkerFormat"]]) -> int:
+        state = True
+
+        while state:
+            state = False
+
+            def applyFormat(format: USFMMarkerFormat) -> bool:
+                nonlocal start
+                marker_following_parse = format_parser.parse(text, start, formats=formats)
+                if marker_following_parse != None:
+                    marker_following, start = marker_following_parse
+                    if contents.descendants is None: 
+                        contents.descendants = []
+                    contents.descendants.append(marker_following)
+                    return True
+                return False
+
+            for format in self.may_contains:
+                if isinstance(format, str):
+                    if format.startswith('{') and format.endswith('}'):
+                        category = format[1:-1]
+                        for format_parser in formats[category].values():
+                            if applyFormat(format_parser):
+                                state = True
+                                break
+                    else:
+                        format_parser = next(format_category for format_category in formats.values() if format in format_category)[format]
+                        if applyFormat(format_parser):
+                            state = True
+                            break
+                else:
+                    format_parser = format
+                    if applyFormat(format):
+                        state = True
+                        break
+
+        return start
+
+    def parse_opened(
+            self,
+            text: str,
+            start_marker: int,
+            start: int,
+            nested: bool,
+            parse_descendants: Optional[Callable[[USFMMarkerContents, int], int]]
+        ) -> tuple[USFMMarkerContents, int] | None:
+        """Parses the rest of a marker whose name (if any) ends at `start`"""
+        head = self.parse_head(text, start_marker, start, nested)
+        if head is None:
+            return None
+        contents, start, closing_marker = head
+
+        if self.may_contains and parse_descendants is not None:
+            start = parse_descendants(contents, start)
+
+        return self.parse_tail(text, start, contents, closing_marker)
+
+    def parse_head(self, text: str, start_marker: int, start: int, nested: bool, spans: bool = False) -> tuple[USFMMarkerContents, int, Optional[str]] | None:
+        """Parses the level, number and text of a marker whose name (if any) ends at `start`
+
+        Returns the contents, where they continue and the closing marker to expect.
+        With `spans`, the text is left in the source as `contents.text_span`.
+        """
+        contents = USFMMarkerContents()
+
+        def skip_whitespace():
+            nonlocal start
+            start = _WHITESPACE.match(text, start).end()
+
+        closing_marker = None # type: Optional[str]
+
+        if nested:
+            contents.nested = True
+
+        if self.name is not None:
             contents.name = self.name
 
             if self.leveled == Option.optional or self.leveled == Option.required:
@@ -96,7 +199,11 @@ class USFMMarkerFormat:
                         contents.level = 1
 
             end_marker = start
-            opening_marker = text[start_marker:end_marker]
+            if self.closed != Option.off:
+                if end_marker - start_marker == len(self.name) + (2 if nested else 1):
+                    closing_marker = self.closing_markers[nested]
+                else:
+                    closing_marker = f"{text[start_marker:end_marker]}*"
 
             skip_whitespace()
 
@@ -139,49 +246,41 @@ class USFMMarkerFormat:
             if attributes_following != -1 and attributes_following < end_attribute_list:
                 end_attribute_list = attributes_following
 
-            contents.text = text[start:end_attribute_list].strip()
-            if len(contents.text) == 0:
+            start_text = min(_WHITESPACE.match(text, start).end(), end_attribute_list)
+            end_text = end_attribute_list
+            while end_text > start_text and text[end_text - 1].isspace():
+                end_text -= 1
+
+            if spans:
+                contents.text_span = (start_text, end_text)
+            else:
+                contents.text = text[start_text:end_text]
+            if end_text == start_text:
                 if self.text == Option.required:
                     return None
             
             start = end_attribute_list
             skip_whitespace()
 
-        if self.may_contains:
-            state = True
-
-            while state:
-                state = False
-
-                def applyFormat(format: USFMMarkerFormat) -> bool:
-                    nonlocal start
-                    marker_following_parse = format_parser.parse(text, start, formats=formats)
-                    if marker_following_parse != None:
-                        marker_following, start = marker_following_parse
-                        if contents.descendants is None: 
-                            contents.descendants = []
-                        contents.descendants.append(marker_following)
-                        return True
-                    return False
-
-                for format in self.may_contains:
-                    if isinstance(format, str):
-                        if format.startswith('{') and format.endswith('}'):
-                            category = format[1:-1]
-                            for format_parser in formats[category].values():
-                                if applyFormat(format_parser):
-                                    state = True
-                                    break
-                        else:
-                            format_parser = next(format_category for format_category in formats.values() if format in format_category)[format]
-                            if applyFormat(format_parser):
-                                state = True
-                                break
-                    else:
-                        if applyFormat(format):
-                            state = True
-                            break
-        
+        return contents, start, closing_marker
+
+    def is_plain_text(self) -> bool:
+        """Whether contents of this format are only text, streamed as text events"""
+        return self.name is None and not self.may_contains and self.numbered == Option.off and self.attributes == Option.off
+
+    def can_fail_after_head(self) -> bool:
+        """Whether parsing may still fail after `parse_head` succeeded"""
+        return self.attributes == Option.required or self.closed == Option.required
+
+    def parse_tail(self, text: str, start: int, contents: USFMMarkerContents, closing_marker: Optional[str], spans: bool = False) -> tuple[USFMMarkerContents, int] | None:
+        """Parses the attributes and closing marker following a marker's descendants
+
+        With `spans`, attribute values are left in the source as `contents.attribute_spans`.
+        """
+        def skip_whitespace():
+            nonlocal start
+            start = _WHITESPACE.match(text, start).end()
+
         if self.attributes != Option.off:
             if text[start] != '|':
                 if self.attributes == Option.required:
@@ -198,7 +297,10 @@ class USFMMarkerFormat:
             if marker_following != -1 and marker_following < end_attribute_list:
                 end_attribute_list = marker_following
             
-            contents.attributes = {}
+            if spans:
+                contents.attribute_spans = {}
+            else:
+                contents.attributes = {}
 
             while start_attribute_list < end_attribute_list:
                 end_attribute_A = end_attribute_list
@@ -212,7 +314,10 @@ class USFMMarkerFormat:
                     end_attribute_A = equal_sign_following
 
                 if space_following ==  end_attribute_A:
-                    contents.attributes[self.default_attribute] = text[start_attribute_list:end_attribute_A]
+                    if spans:
+                        contents.attribute_spans[self.default_attribute] = (start_attribute_list, end_attribute_A)
+                    else:
+                        contents.attributes[self.default_attribute] = text[start_attribute_list:end_attribute_A]
                     start_attribute_list = end_attribute_A
                 else:
                     start_attribute_name = start_attribute_list
@@ -230,9 +335,11 @@ class USFMMarkerFormat:
                     start_attribute_list = end_attribute_value + 1
 
                     attribute_name = text[start_attribute_name:end_attribute_name]
-                    attribute_value = text[start_attribute_value:end_attribute_value]
 
-                    contents.attributes[attribute_name] = attribute_value
+                    if spans:
+                        contents.attribute_spans[attribute_name] = (start_attribute_value, end_attribute_value)
+                    else:
+                        contents.attributes[attribute_name] = text[start_attribute_value:end_attribute_value]
 
                 while start_attribute_list < end_attribute_list and text[start_attribute_list].isspace():
                     start_attribute_list += 1
@@ -241,8 +348,7 @@ class USFMMarkerFormat:
             skip_whitespace()
 
         if self.closed != Option.off:
-            assert opening_marker is not None
-            closing_marker = f"{opening_marker}*"
+            assert closing_marker is not None
             if not text.startswith(closing_marker, start):
                 if self.closed == Option.required:
                     return None
@@ -296,6 +402,39 @@ class USFMMarkerFormatsFile:
     header = USFMMarkerFormat("h", text=Option.required)
     id = USFMMarkerFormat("id", text=Option.required)
 
+class USFMParseError(ValueError):
+    """Raised when no format accepts the marker at a position of a USFM file"""
+
+    def __init__(self, filename: Optional[str], line: int, column: int, marker: str):
+        super().__init__(filename, line, column, marker)
+        self.filename = filename
+        self.line = line
+        self.column = column
+        self.marker = marker
+
+    @staticmethod
+    def at(text: str, start: int, filename: Optional[str] = None) -> "USFMParseError":
+        line = text.count('\n', 0, start) + 1
+        column = start - text.rfind('\n', 0, start)
+        end = text.find('\n', start)
+        return USFMParseError(filename=filename, line=line, column=column, marker=text[start:end if end != -1 else len(text)][:40])
+
+    def __str__(self) -> str:
+        return f"{self.filename or '<text>'}:{self.line}:{self.column}: unsupported USFM at {self.marker!r}"
+
+class USFMReadError(Exception):
+    """Raised after reading a directory in which some files failed to be read or parsed, with the error of each by filename"""
+
+    def __init__(self, errors: dict[str, Exception]):
+        super().__init__(errors)
+        self.errors = errors
+
+    def __str__(self) -> str:
+        return "\n".join(
+            str(error) if isinstance(error, USFMParseError) else f"{filename}: {type(error).__name__}: {error}"
+            for filename, error in self.errors.items()
+        )
+
 class USFMFile:
     def __init__(
             self,
@@ -308,110 +447,756 @@ class USFMFile:
 def formatList(formats):
     return [format for format in vars(formats).values() if isinstance(format, USFMMarkerFormat)]
 
-def read_Bible_USFM(directory: str, skip: Optional[list[str]] = None) -> list[USFMFile]:
-    
-    def formatCategory(formats) -> str:
-        return next(category for key, category in vars(formats).items() if key.endswith("_category"))
+def formatCategory(formats) -> str:
+    return next(category for key, category in vars(formats).items() if key.endswith("_category"))
 
-    def formatMap(formats):
-        return { format.name: format for format in formatList(formats) }
-    
-    formats = { formatCategory(formats): formatMap(formats) for formats in [USFMMarkerFormatsCharacter, USFMMarkerFormatsParagraph, USFMMarkerFormatsFootnote, USFMMarkerFormatsFile] }
+def formatMap(formats):
+    return { format.name: format for format in formatList(formats) }
 
-    files = [] # type: list[USFMFile]
+def formatCategories() -> dict[str, dict[str | None, USFMMarkerFormat]]:
+    return { formatCategory(formats): formatMap(formats) for formats in [USFMMarkerFormatsCharacter, USFMMarkerFormatsParagraph, USFMMarkerFormatsFootnote, USFMMarkerFormatsFile] }
 
-    for filename in os.listdir(directory):
-        if not filename.endswith(".usfm") or (skip is not None and filename in skip):
-            continue
+class USFMMarkerTable:
+    """Formats that may follow at a position, looked up by marker name"""
 
-        contents = [] # type: list[USFMMarkerContents]
+    def __init__(self, formats: list[USFMMarkerFormat]):
+        # Unnamed formats requiring text never match at a backslash, so markers skip them
+        unnamed = [format for format in formats if format.name is None]
+        unnamed_at_marker = [format for format in unnamed if format.text != Option.required]
+
+        self.unnamed = tuple(unnamed)
+        self.markers = {} # type: dict[str, tuple[USFMMarkerFormat, ...]]
+
+        for format in formats:
+            if format.name is not None and format.name not in self.markers:
+                self.markers[format.name] = tuple(
+                    candidate for candidate in formats
+                    if candidate is format or candidate in unnamed_at_marker
+                )
+
+        self.unnamed_at_marker = tuple(unnamed_at_marker)
 
-        text: str
-        with open(os.path.join(directory, filename), 'r', encoding='utf-8') as file:
-            text = file.read()
+class USFMParser:
+    """Single-pass USFM parser
 
+    Reads each backslash marker once and sends it to its format through
+    prebuilt marker-name tables, building the same `USFMMarkerContents` tree
+    as trying every format in turn with `USFMMarkerFormat.parse`.
+    """
+
+    def __init__(self, formats: Optional[dict[str, dict[str | None, USFMMarkerFormat]]] = None):
+        self.formats = formats if formats is not None else formatCategories()
+        self.file_table = USFMMarkerTable(list(self.formats[USFMMarkerFormatsFile._category].values()))
+        self.tables = {} # type: dict[USFMMarkerFormat, USFMMarkerTable]
+
+    def table(self, format: USFMMarkerFormat) -> USFMMarkerTable:
+        table = self.tables.get(format)
+        if table is None:
+            contained = [] # type: list[USFMMarkerFormat]
+            for may_contain in format.may_contains:
+                if isinstance(may_contain, str):
+                    if may_contain.startswith('{') and may_contain.endswith('}'):
+                        contained.extend(self.formats[may_contain[1:-1]].values())
+                    else:
+                        contained.append(next(format_category for format_category in self.formats.values() if may_contain in format_category)[may_contain])
+                else:
+                    contained.append(may_contain)
+            table = self.tables[format] = USFMMarkerTable(contained)
+        return table
+
+    def lex(self, table: USFMMarkerTable, text: str, start: int) -> tuple[tuple[USFMMarkerFormat, ...], int, bool]:
+        """Reads the marker at `start` once, returning its candidate formats, the end of its name and whether it is nested"""
+        if text[start] == '\\':
+            marker = _MARKER.match(text, start)
+            return table.markers.get(marker.group(2), table.unnamed_at_marker), marker.end(), len(marker.group(1)) > 0
+        else:
+            return table.unnamed, start, False
+
+    def parse_marker(self, table: USFMMarkerTable, text: str, start: int) -> tuple[USFMMarkerContents, int] | None:
+        if start == len(text):
+            return None
+
+        candidates, name_end, nested = self.lex(table, text, start)
+
+        for format in candidates:
+            if format.name is None:
+                result = format.parse_opened(text, start, start, False, self.descendants_parser(format, text))
+            elif nested and format.nested == Option.off:
+                continue
+            else:
+                result = format.parse_opened(text, start, name_end, nested, self.descendants_parser(format, text))
+
+            if result is not None:
+                return result
+
+        return None
+
+    def descendants_parser(self, format: USFMMarkerFormat, text: str) -> Optional[Callable[[USFMMarkerContents, int], int]]:
+        if not format.may_contains:
+            return None
+
+        table = self.table(format)
+
+        def parse_descendants(contents: USFMMarkerContents, start: int) -> int:
+            while True:
+                result = self.parse_marker(table, text, start)
+                if result is None:
+                    return start
+                descendant, start = result
+                if contents.descendants is None:
+                    contents.descendants = []
+                contents.descendants.append(descendant)
+
+        return parse_descendants
+
+    def parse(self, text: str, filename: Optional[str] = None) -> list[USFMMarkerContents]:
+        contents = [] # type: list[USFMMarkerContents]
         start = 0
-        
+
         while start < len(text):
-            parsed = False
-
-            for format in formats[USFMMarkerFormatsFile._category].values():
-                result = format.parse(text, start, formats=formats)
-                if result is not None:
-                    parsed = True
-                    content, start = result
-                    contents.append(content)
+            result = self.parse_marker(self.file_table, text, start)
+            if result is None:
+                raise USFMParseError.at(text, start, filename=filename)
+            content, start = result
+            contents.append(content)
+
+        return contents
+
+    def walk_marker(self, table: USFMMarkerTable, text: str, start: int, spans: bool = False) -> Generator[USFMEvent, None, Optional[int]]:
+        """Yields the events of the marker at `start`, returning where it ends
+
+        Events stream out as soon as a marker's head is parsed, except for
+        formats that may still fail at their attributes or closing marker,
+        whose (inline) events are held back until they succeed.
+        """
+        if start == len(text):
+            return None
+
+        candidates, name_end, nested = self.lex(table, text, start)
+
+        for format in candidates:
+            if format.name is None:
+                head = format.parse_head(text, start, start, False, spans)
+            elif nested and format.nested == Option.off:
+                continue
+            else:
+                head = format.parse_head(text, start, name_end, nested, spans)
+
+            if head is None:
+                continue
+
+            if format.can_fail_after_head():
+                events = [] # type: list[USFMEvent]
+                walk = self.walk_opened(format, text, *head, spans)
+                while True:
+                    try:
+                        events.append(next(walk))
+                    except StopIteration as stop:
+                        end = stop.value
+                        break
+                if end is None:
+                    continue
+                yield from events
+                return end
+            else:
+                return (yield from self.walk_opened(format, text, *head, spans))
+
+        return None
+
+    def walk_opened(self, format: USFMMarkerFormat, text: str, contents: USFMMarkerContents, start: int, closing_marker: Optional[str], spans: bool = False) -> Generator[USFMEvent, None, Optional[int]]:
+        if format.is_plain_text():
+            tail = format.parse_tail(text, start, contents, closing_marker, spans)
+            if tail is None:
+                return None
+            yield USFMEvent(kind=USFMEventKind.TEXT, text=contents.text, span=contents.text_span)
+            return tail[1]
+
+        yield USFMEvent(kind=USFMEventKind.START, name=contents.name, level=contents.level, number=contents.number, nested=contents.nested, text=contents.text, span=contents.text_span)
+
+        if format.may_contains:
+            table = self.table(format)
+            while True:
+                end = yield from self.walk_marker(table, text, start, spans)
+                if end is None:
                     break
+                start = end
 
-            if not parsed:
-                raise NotImplementedError()
-        
-        files.append(USFMFile(filename=filename, contents=contents))
+        tail = format.parse_tail(text, start, contents, closing_marker, spans)
+        if tail is None:
+            return None
+
+        if contents.attributes is not None:
+            for name, value in contents.attributes.items():
+                yield USFMEvent(kind=USFMEventKind.ATTRIBUTE, name=name, text=value)
+        elif contents.attribute_spans is not None:
+            for name, span in contents.attribute_spans.items():
+                yield USFMEvent(kind=USFMEventKind.ATTRIBUTE, name=name, span=span)
+
+        yield USFMEvent(kind=USFMEventKind.END, name=contents.name)
+        return tail[1]
+
+    def events(self, text: str, filename: Optional[str] = None, spans: bool = False) -> Generator[USFMEvent, None, None]:
+        """Yields start-marker, text, attribute and end-marker events without building a tree
+
+        With `spans`, texts and attribute values are given as spans of `text` instead of copied out of it.
+        """
+        start = 0
+
+        while start < len(text):
+            end = yield from self.walk_marker(self.file_table, text, start, spans)
+            if end is None:
+                raise USFMParseError.at(text, start, filename=filename)
+            start = end
+
+def parse_USFM_by_trial(text: str, formats: dict[str, dict[str | None, USFMMarkerFormat]], filename: Optional[str] = None) -> list[USFMMarkerContents]:
+    contents = [] # type: list[USFMMarkerContents]
+    start = 0
     
+    while start < len(text):
+        parsed = False
+
+        for format in formats[USFMMarkerFormatsFile._category].values():
+            result = format.parse(text, start, formats=formats)
+            if result is not None:
+                parsed = True
+                content, start = result
+                contents.append(content)
+                break
+
+        if not parsed:
+            raise USFMParseError.at(text, start, filename=filename)
+
+    return contents
+
+class USFMNodeStore:
+    """Parsed markers of a USFM file as parallel arrays
+
+    Nodes are stored in document order, so the descendants of a node are the
+    nodes up to its `end`. Marker and attribute names are interned, and texts
+    and attribute values are kept as spans of one shared string, which is the
+    parsed source itself when the events give spans of it.
+    """
+
+    def __init__(self):
+        self.names = [None] # type: list[Optional[str]]
+        self.text = ""
+
+        self.name = array('H')
+        self.level = array('h')
+        self.number = array('i')
+        self.nested = array('B')
+        self.parent = array('i')
+        self.end = array('i')
+        self.text_start = array('i')
+        self.text_length = array('i')
+        self.attributes_start = array('i')
+        self.attributes_count = array('H')
+
+        self.attribute_name = array('H')
+        self.attribute_value_start = array('i')
+        self.attribute_value_length = array('i')
+
+    def __len__(self) -> int:
+        return len(self.name)
+
+    @staticmethod
+    def from_events(events: Iterable[USFMEvent], source: Optional[str] = None) -> "USFMNodeStore":
+        """Stores parsed events, whose spans (if any) are of `source`"""
+        store = USFMNodeStore()
+        name_ids = { None: 0 } # type: dict[Optional[str], int]
+        texts = [source] if source is not None else [] # type: list[str]
+        text_end = len(source) if source is not None else 0
+        open_nodes = [] # type: list[int]
+
+        def intern_name(name: Optional[str]) -> int:
+            name_id = name_ids.get(name)
+            if name_id is None:
+                name_id = name_ids[name] = len(store.names)
+                store.names.append(name)
+            return name_id
+
+        def add_text(text: Optional[str], span: Optional[tuple[int, int]]) -> tuple[int, int]:
+            nonlocal text_end
+            if span is not None:
+                return span[0], span[1] - span[0]
+            if text is None:
+                return -1, -1
+            texts.append(text)
+            text_end += len(text)
+            return text_end - len(text), len(text)
+
+        def add_node(name: Optional[str], level: Optional[int], number: Optional[int], nested: bool, text: Optional[str], span: Optional[tuple[int, int]]) -> int:
+            index = len(store.name)
+            store.name.append(intern_name(name))
+            store.level.append(level if level is not None else -1)
+            store.number.append(number if number is not None else -1)
+            store.nested.append(1 if nested else 0)
+            store.parent.append(open_nodes[-1] if len(open_nodes) > 0 else -1)
+            store.end.append(index + 1)
+            text_start, text_length = add_text(text, span)
+            store.text_start.append(text_start)
+            store.text_length.append(text_length)
+            store.attributes_start.append(-1)
+            store.attributes_count.append(0)
+            return index
+
+        for event in events:
+            if event.kind == USFMEventKind.START:
+                open_nodes.append(add_node(event.name, event.level, event.number, event.nested, event.text, event.span))
+            elif event.kind == USFMEventKind.TEXT:
+                add_node(None, None, None, False, event.text, event.span)
+            elif event.kind == USFMEventKind.ATTRIBUTE:
+                index = open_nodes[-1]
+                if store.attributes_count[index] == 0:
+                    store.attributes_start[index] = len(store.attribute_name)
+                store.attributes_count[index] += 1
+                store.attribute_name.append(intern_name(event.name))
+                value_start, value_length = add_text(event.text, event.span)
+                store.attribute_value_start.append(value_start)
+                store.attribute_value_length.append(value_length)
+            else:
+                index = open_nodes.pop()
+                store.end[index] = len(store.name)
+
+        store.text = texts[0] if len(texts) == 1 else "".join(texts)
+        return store
+
+    def children(self, index: int) -> Generator[int, None, None]:
+        """Indexes of the top-level nodes (`index` -1) or of the children of a node"""
+        child = index + 1
+        end = self.end[index] if index >= 0 else len(self.name)
+        while child < end:
+            yield child
+            child = self.end[child]
+
+    def roots(self) -> list["USFMNodeView"]:
+        return [USFMNodeView(self, index) for index in self.children(-1)]
+
+    _ARRAYS = ["name", "level", "number", "nested", "parent", "end", "text_start", "text_length", "attributes_start", "attributes_count", "attribute_name", "attribute_value_start", "attribute_value_length"]
+    _MAGIC = b"USFMNS02"
+
+    def to_bytes(self) -> bytes:
+        """Serializes the store so that `from_buffer` can use its arrays in place"""
+        sections = [getattr(self, name).tobytes() for name in USFMNodeStore._ARRAYS] + [
+            "".join(f"{name}\0" for name in self.names[1:]).encode('utf-8'),
+            self.text.encode('utf-8'),
+        ]
+
+        header = USFMNodeStore._MAGIC + struct.pack(f"<{len(sections)}Q", *(len(section) for section in sections))
+        parts = [header]
+        offset = len(header)
+        for section in sections:
+            padding = -offset % 8
+            parts.append(b"\0" * padding + section)
+            offset += padding + len(section)
+
+        return b"".join(parts)
+
+    @staticmethod
+    def from_buffer(buffer) -> "USFMNodeStore":
+        """Loads a store serialized by `to_bytes`, whose arrays stay views of `buffer` (e.g. an `mmap`)
+
+        Raises ValueError if `buffer` doesn't hold a whole store, having released
+        its views of `buffer` so that it can be closed.
+        """
+        store = USFMNodeStore()
+        view = memoryview(buffer)
+        sections = [] # type: list[memoryview]
+        try:
+            count = len(USFMNodeStore._ARRAYS) + 2
+            offset = len(USFMNodeStore._MAGIC) + 8 * count
+            if len(view) < offset or bytes(view[:len(USFMNodeStore._MAGIC)]) != USFMNodeStore._MAGIC:
+                raise ValueError("not a serialized USFMNodeStore")
+
+            lengths = struct.unpack_from(f"<{count}Q", view, len(USFMNodeStore._MAGIC))
+            for length in lengths:
+                offset += -offset % 8
+                if offset + length > len(view):
+                    raise ValueError("truncated serialized USFMNodeStore")
+                sections.append(view[offset:offset + length])
+                offset += length
+
+            for name, section in zip(USFMNodeStore._ARRAYS, sections):
+                if len(section) % getattr(store, name).itemsize != 0:
+                    raise ValueError(f"serialized USFMNodeStore has a partial {name} array")
+
+            names, text = [str(section, 'utf-8') for section in sections[len(USFMNodeStore._ARRAYS):]]
+        except Exception:
+            for section in sections:
+                section.release()
+            view.release()
+            raise
+
+        for name, section in zip(USFMNodeStore._ARRAYS, sections):
+            setattr(store, name, section.cast(getattr(store, name).typecode))
+        store.names = [None] + names.split("\0")[:-1]
+        store.text = text
+        return store
+
+class USFMNodeView:
+    """Read-only `USFMMarkerContents` view of a node in a `USFMNodeStore`"""
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, store: USFMNodeStore, index: int):
+        self.store = store
+        self.index = index
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.store.names[self.store.name[self.index]]
+
+    @property
+    def level(self) -> Optional[int]:
+        level = self.store.level[self.index]
+        return level if level >= 0 else None
+
+    @property
+    def number(self) -> Optional[int]:
+        number = self.store.number[self.index]
+        return number if number >= 0 else None
+
+    @property
+    def nested(self) -> bool:
+        return self.store.nested[self.index] != 0
+
+    @property
+    def text(self) -> Optional[str]:
+        length = self.store.text_length[self.index]
+        if length < 0:
+            return None
+        start = self.store.text_start[self.index]
+        return self.store.text[start:start + length]
+
+    @property
+    def descendants(self) -> Optional[list["USFMNodeView"]]:
+        if self.store.end[self.index] == self.index + 1:
+            return None
+        return [USFMNodeView(self.store, child) for child in self.store.children(self.index)]
+
+    @property
+    def attributes(self) -> Optional[dict[str, str]]:
+        count = self.store.attributes_count[self.index]
+        if count == 0:
+            return None
+        start = self.store.attributes_start[self.index]
+        store = self.store
+        return {
+            store.names[store.attribute_name[i]]: store.text[store.attribute_value_start[i]:store.attribute_value_start[i] + store.attribute_value_length[i]]
+            for i in range(start, start + count)
+        }
+
+USFM_PARSER_VERSION = 2
+
+_parser = None # type: USFMParser | None
+
+def read_USFM_text(directory: str, filename: str) -> bytes:
+    with open(os.path.join(directory, filename), 'rb') as file:
+        return file.read()
+
+def decode_USFM_text(data: bytes) -> str:
+    text = str(data, 'utf-8')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+def parse_USFM_store(data: bytes, filename: str) -> USFMNodeStore:
+    """Parses a file into a store of spans of its decoded text, copying no text out of it"""
+    global _parser
+    if _parser is None:
+        _parser = USFMParser()
+
+    text = decode_USFM_text(data)
+    return USFMNodeStore.from_events(_parser.events(text, filename=filename, spans=True), source=text)
+
+def cache_USFM_file(directory: str, filename: str, cache: "USFMParseCache") -> str:
+    """Parses a file into `cache` unless it is cached already, returning its key"""
+    data = read_USFM_text(directory, filename)
+    key = cache.key(data)
+    if not cache.contains(key):
+        cache.put(key, parse_USFM_store(data, filename=filename))
+    return key
+
+def read_USFM_file(directory: str, filename: str, compact: bool = False, cache: Optional["USFMParseCache"] = None) -> USFMFile:
+    global _parser
+    if _parser is None:
+        _parser = USFMParser()
+
+    data = read_USFM_text(directory, filename)
+
+    if cache is not None:
+        key = cache.key(data)
+        store = cache.get(key)
+        if store is None:
+            store = parse_USFM_store(data, filename=filename)
+            cache.put(key, store)
+        return USFMFile(filename=filename, contents=store.roots())
+    elif compact:
+        return USFMFile(filename=filename, contents=parse_USFM_store(data, filename=filename).roots())
+    else:
+        return USFMFile(filename=filename, contents=_parser.parse(decode_USFM_text(data), filename=filename))
+
+def read_Bible_USFM(directory: str, skip: Optional[list[str]] = None, workers: Optional[int] = 1, compact: bool = False, cache: Optional["USFMParseCache"] = None) -> list[USFMFile]:
+    """Parses the `.usfm` files of a directory, sorted by filename
+
+    With `workers` other than 1, files are parsed across a process pool of that
+    many processes (`None` for one per CPU). Every file is attempted; files that
+    fail to be read or parsed, for whatever reason, including a worker that
+    died, are reported together in a `USFMReadError`.
+
+    With `compact`, each file is kept in a `USFMNodeStore` and its contents are
+    `USFMNodeView`s instead of `USFMMarkerContents`. With a `cache`, files are
+    always compact, and unchanged files are loaded from the cache unparsed.
+    """
+    filenames = sorted(
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".usfm") and not (skip is not None and filename in skip)
+    )
+
+    files = [] # type: list[USFMFile]
+    errors = {} # type: dict[str, Exception]
+
+    if workers == 1:
+        for filename in filenames:
+            try:
+                files.append(read_USFM_file(directory, filename, compact, cache))
+            except Exception as error:
+                errors[filename] = error
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Cached stores are memory-mapped, so workers only fill the cache for this process to map
+            if cache is not None:
+                futures = [executor.submit(cache_USFM_file, directory, filename, cache) for filename in filenames]
+            else:
+                futures = [executor.submit(read_USFM_file, directory, filename, compact) for filename in filenames]
+
+            for filename, future in zip(filenames, futures):
+                try:
+                    if cache is not None:
+                        future.result()
+                        files.append(read_USFM_file(directory, filename, compact, cache))
+                    else:
+                        files.append(future.result())
+                except Exception as error:
+                    errors[filename] = error
+
+    if len(errors) > 0:
+        raise USFMReadError(errors)
+
     return files
 
-def read_Bible(directory: str, session: Session, title: str, **kwargs) -> Item:
-    Bible = Item(text=title, children_display_class=ItemChildrenDisplayClass.TABLE_OF_CONTENTS)
+def read_USFM_events(directory: str, filename: str) -> Generator[USFMEvent, None, None]:
+    global _parser
+    if _parser is None:
+        _parser = USFMParser()
 
-    paragraph_names = [format.name for format in formatList(USFMMarkerFormatsParagraph)]
+    yield from _parser.events(decode_USFM_text(read_USFM_text(directory, filename)), filename=filename)
+
+def read_Bible_USFM_events(directory: str, skip: Optional[list[str]] = None) -> Generator[tuple[str, Generator[USFMEvent, None, None]], None, None]:
+    """Yields each `.usfm` file of a directory, sorted by filename, with a generator of its events
+
+    Only the text of the file being read is held in memory.
+    """
+    filenames = sorted(
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".usfm") and not (skip is not None and filename in skip)
+    )
+
+    for filename in filenames:
+        yield filename, read_USFM_events(directory, filename)
+
+DESCRIPTIVE_TITLE_LABEL = "superscript"
+
+def plain_selah(text: str) -> str:
+    return text.strip().removeprefix("[").strip()
 
-    def space_plain_text_character(verse_contents: list[USFMMarkerContents]) -> str:
-        text = ""
+class BibleItemBuilder:
+    """Assembles Bible, book, chapter, paragraph and verse Items in reading order"""
 
+    def __init__(self, title: str):
+        self.Bible = Item(text=title, children_display_class=ItemChildrenDisplayClass.TABLE_OF_CONTENTS)
+        self.book = None # type: Item | None
+        self.chapter = None # type: Item | None
+        self.paragraph_verses = [] # type: list[ItemChild]
+
+    def add_book(self, name: Optional[str]):
+        self.finish_paragraph()
+        self.book = Item(text=name, children_display_class=ItemChildrenDisplayClass.PAGINATION)
+        self.chapter = None
+        self.Bible.children.append(ItemChild(local_index=len(self.Bible.children), label=name, child=self.book, imported=True))
+
+    def add_chapter(self, number: Optional[int]):
+        self.finish_paragraph()
+        self.chapter = Item(children_display_class=ItemChildrenDisplayClass.BLOCK)
+        self.book.children.append(ItemChild(local_index=len(self.book.children), label=str(number), child=self.chapter, imported=True))
+
+    def add_paragraph(self):
+        self.finish_paragraph()
+
+    def add_verse(self, label: Optional[str], text: str):
+        self.paragraph_verses.append(ItemChild(local_index=len(self.paragraph_verses), label=label, child=Item(text=text), imported=True))
+
+    def finish_paragraph(self):
+        if len(self.paragraph_verses) > 0:
+            paragraph = Item(children_display_class=ItemChildrenDisplayClass.INLINE, children=self.paragraph_verses)
+            self.chapter.children.append(ItemChild(local_index=len(self.chapter.children), child=paragraph, imported=True))
+            self.paragraph_verses = []
+
+    def finish(self) -> Item:
+        self.finish_paragraph()
+        return self.Bible
+
+def read_Bible(directory: str, session: Session, title: str, books: Optional[dict[str, Item]] = None, **kwargs) -> Item:
+    """Builds the Items of a Bible, collecting the book Item of each file into `books` if given"""
+    builder = BibleItemBuilder(title=title)
+
+    paragraph_names = [format.name for format in formatList(USFMMarkerFormatsParagraph)]
+
+    def space_plain_text_character(verse_contents: list[USFMMarkerContents], pieces: list[str]) -> list[str]:
+        """Collects the plain text pieces of a verse, to be joined with spaces"""
         for content in verse_contents:
-            if content.name == USFMMarkerFormatsCharacter.text:
-                text += f" {content.text}"
-            elif content.name == USFMMarkerFormatsCharacter.word:
-                text += f" {content.text}"
-            elif content.name == USFMMarkerFormatsCharacter.addition:
-                text += f" {content.text}"
+            if content.name == USFMMarkerFormatsCharacter.text.name:
+                pieces.append(content.text)
+            elif content.name == USFMMarkerFormatsCharacter.word.name:
+                pieces.append(content.text)
+            elif content.name == USFMMarkerFormatsCharacter.addition.name:
+                pieces.append(content.text)
                 if content.descendants is not None:
-                    text += space_plain_text_character(content.descendants)
-            elif content.name == USFMMarkerFormatsCharacter.footnote:
+                    space_plain_text_character(content.descendants, pieces)
+            elif content.name == USFMMarkerFormatsCharacter.footnote.name:
                 pass
-            elif content.name == USFMMarkerFormatsCharacter.selah:
-                if content.text.startswith("["):
-                    text += f" {content.text[1:]}"
-                else:
-                    text += f" {content.text}"
+            elif content.name == USFMMarkerFormatsCharacter.selah.name:
                 if content.descendants is not None:
-                    text += space_plain_text_character(content.descendants)
+                    selah = plain_selah(" ".join(space_plain_text_character(content.descendants, [])))
+                    if len(selah) > 0:
+                        pieces.append(selah)
             else:
                 raise NotImplementedError()
 
-        return text
+        return pieces
 
     for book in read_Bible_USFM(directory=directory, **kwargs):
-        name: str
+        name = None # type: str | None
+        book_added = False
         
         for file_content in book.contents:
             if file_content.name == USFMMarkerFormatsFile.table_of_contents.name:
                 if file_content.level == 2:
                     name = file_content.text
             elif file_content.name == USFMMarkerFormatsFile.chapter.name:
-                chapter_paragraphs = [] # type: list[ItemChild]
+                if not book_added:
+                    builder.add_book(name)
+                    book_added = True
+                    if books is not None:
+                        books[book.filename] = builder.book
+
+                builder.add_chapter(file_content.number)
 
                 current_verse_usfm = [] # type: list[USFMMarkerContents]
                 current_verse_label: str | None = None
 
-                current_paragraph_verses = [] # type: list[ItemChild]
-
                 def save_verse():
                     if len(current_verse_usfm) > 0:
-                        current_verse_text = space_plain_text_character(current_verse_usfm)[1:]
+                        current_verse_text = " ".join(space_plain_text_character(current_verse_usfm, []))
                         current_verse_usfm.clear()
-                        current_paragraph_verses.append(ItemChild(label=current_verse_label, child=Item(text=current_verse_text)))
+                        if len(current_verse_text) > 0:
+                            builder.add_verse(current_verse_label, current_verse_text)
 
-                for paragraph_content in file_content.descendants:
+                for paragraph_content in (file_content.descendants or []):
                     if paragraph_content.name in paragraph_names:
-                        if current_verse_label is not None and len(current_verse_usfm) > 0:
-                            save_verse()
-                        
-                        chapter_paragraphs.append(ItemChild(child=Item(children_display_class=ItemChildrenDisplayClass.INLINE, children=current_paragraph_verses)))
-                        current_paragraph_verses = []
-                    elif paragraph_content.name == USFMMarkerFormatsCharacter.verse:
                         save_verse()
-                        current_verse_label = str(paragraph_content.number)
+                        builder.add_paragraph()
 
+                        if paragraph_content.name == USFMMarkerFormatsParagraph.descriptive_title.name and paragraph_content.descendants is not None:
+                            current_verse_label = DESCRIPTIVE_TITLE_LABEL
+                            current_verse_usfm.extend(paragraph_content.descendants)
+                    elif paragraph_content.name == USFMMarkerFormatsCharacter.verse.name:
+                        save_verse()
+                        current_verse_label = str(paragraph_content.number)
+                    else:
+                        current_verse_usfm.append(paragraph_content)
+
+                save_verse()
+
+    return builder.finish()
+
+def read_Bible_streaming(directory: str, session: Session, title: str, skip: Optional[list[str]] = None) -> Item:
+    """Builds the same Items as `read_Bible` straight from USFM events, one book at a time"""
+    builder = BibleItemBuilder(title=title)
+
+    paragraph_names = set(format.name for format in formatList(USFMMarkerFormatsParagraph))
+    piece_names = set([USFMMarkerFormatsCharacter.word.name, USFMMarkerFormatsCharacter.addition.name])
+
+    for filename, events in read_Bible_USFM_events(directory=directory, skip=skip):
+        name = None # type: str | None
+        book_added = False
+
+        depth = 0
+        skip_depth = None # type: int | None
+        verse_pieces = [] # type: list[str]
+        verse_label = None # type: str | None
+        selahs = [] # type: list[list[str]]
+
+        def save_verse():
+            nonlocal verse_pieces
+            if len(verse_pieces) > 0:
+                builder.add_verse(verse_label, " ".join(verse_pieces))
+                verse_pieces = []
+
+        for event in events:
+            pieces = selahs[-1] if len(selahs) > 0 else verse_pieces
+
+            if event.kind == USFMEventKind.END:
+                depth -= 1
+                if skip_depth is not None:
+                    if depth == skip_depth:
+                        skip_depth = None
+                elif event.name == USFMMarkerFormatsCharacter.selah.name:
+                    selah = plain_selah(" ".join(selahs.pop()))
+                    if len(selah) > 0:
+                        (selahs[-1] if len(selahs) > 0 else verse_pieces).append(selah)
+                elif depth == 0 and event.name == USFMMarkerFormatsFile.chapter.name:
+                    save_verse()
+                continue
+
+            if event.kind == USFMEventKind.START:
+                depth += 1
+
+            if skip_depth is not None or event.kind == USFMEventKind.ATTRIBUTE:
+                continue
+
+            if event.kind == USFMEventKind.TEXT:
+                if depth > 0:
+                    pieces.append(event.text)
+            elif depth == 1:
+                if event.name == USFMMarkerFormatsFile.table_of_contents.name:
+                    if event.level == 2:
+                        name = event.text
+                elif event.name == USFMMarkerFormatsFile.chapter.name:
+                    if not book_added:
+                        builder.add_book(name)
+                        book_added = True
+
+                    builder.add_chapter(event.number)
+                    verse_label = None
+            elif depth == 2 and event.name in paragraph_names:
+                save_verse()
+                builder.add_paragraph()
+
+                if event.name == USFMMarkerFormatsParagraph.descriptive_title.name:
+                    verse_label = DESCRIPTIVE_TITLE_LABEL
+                else:
+                    skip_depth = depth - 1
+            elif depth == 2 and event.name == USFMMarkerFormatsCharacter.verse.name:
+                save_verse()
+                verse_label = str(event.number)
+            elif event.name in piece_names:
+                pieces.append(event.text)
+            elif event.name == USFMMarkerFormatsCharacter.selah.name:
+                selahs.append([])
+            elif event.name == USFMMarkerFormatsCharacter.footnote.name:
+                skip_depth = depth - 1
+            else:
+                raise NotImplementedError()
 
-    return Bible
\ No newline at end of file
+    return builder.finish()
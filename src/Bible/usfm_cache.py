@@ -0,0 +1,143 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import time
+from typing import Optional
+
+import typer
+
+from src.Bible.usfm import USFM_PARSER_VERSION, USFMNodeStore
+
+DEFAULT_DIRECTORY = os.path.join(".cache", "usfm")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Age after which a temporary file is taken to be left behind by a process that died while writing an entry
+STALE_TEMPORARY_SECONDS = 60 * 60
+
+class USFMParseCache:
+    """On-disk cache of parsed USFM files
+
+    Entries are `USFMNodeStore`s serialized to one file each, keyed by a hash
+    of the file's bytes and the parser version, and memory-mapped when loaded.
+    Least recently used entries are evicted once the cache exceeds `max_bytes`.
+    An entry that can't be loaded is removed and treated as a miss.
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, data: bytes) -> str:
+        digest = hashlib.sha256(f"{USFM_PARSER_VERSION}\n".encode('utf-8'))
+        digest.update(data)
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.usfmns")
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def get(self, key: str) -> Optional[USFMNodeStore]:
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # An empty file can't be mapped
+            self.remove(path)
+            return None
+
+        try:
+            return USFMNodeStore.from_buffer(buffer)
+        except Exception:
+            buffer.close()
+            self.remove(path)
+            return None
+
+    def put(self, key: str, store: USFMNodeStore):
+        os.makedirs(self.directory, exist_ok=True)
+
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(store.to_bytes())
+        try:
+            os.replace(temporary_path, self.path(key))
+        except FileNotFoundError:
+            # The cache was cleared meanwhile, so the entry is left out
+            return
+
+        self.evict()
+
+    def remove(self, path: str) -> bool:
+        """Removes a file of the cache, unless another process sharing it has already"""
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def entries(self, suffix: str = ".usfmns") -> list[os.DirEntry]:
+        if not os.path.isdir(self.directory):
+            return []
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith(suffix)]
+
+    def entry_stats(self) -> list[tuple[str, os.stat_result]]:
+        """The path and stat of each entry, leaving out those removed meanwhile by other processes sharing the cache"""
+        stats = [] # type: list[tuple[str, os.stat_result]]
+        for entry in self.entries():
+            try:
+                stats.append((entry.path, entry.stat()))
+            except FileNotFoundError:
+                continue
+        return stats
+
+    def remove_temporary_files(self, max_age: float = STALE_TEMPORARY_SECONDS) -> int:
+        """Removes the temporary files of entries that were never finished, returning how many were removed
+
+        Only files older than `max_age` are removed, as younger ones may still
+        be written by other processes.
+        """
+        now = time.time()
+        removed = 0
+        for entry in self.entries(suffix=".tmp"):
+            try:
+                if now - entry.stat().st_mtime < max_age:
+                    continue
+            except FileNotFoundError:
+                continue
+            removed += self.remove(entry.path)
+        return removed
+
+    def evict(self):
+        self.remove_temporary_files()
+
+        entries = sorted(self.entry_stats(), key=lambda entry: entry[1].st_mtime)
+        size = sum(stat.st_size for _, stat in entries)
+
+        while size > self.max_bytes and len(entries) > 0:
+            path, stat = entries.pop(0)
+            size -= stat.st_size
+            self.remove(path)
+
+    def clear(self) -> int:
+        """Removes every entry and temporary file, returning how many entries were removed"""
+        self.remove_temporary_files(max_age=0)
+        return sum(self.remove(entry.path) for entry in self.entries())
+
+app = typer.Typer()
+
+@app.command()
+def info(directory: str = DEFAULT_DIRECTORY):
+    entries = USFMParseCache(directory=directory).entry_stats()
+    print(f"{len(entries)} cached files, {sum(stat.st_size for _, stat in entries) / 1e6:.1f} MB in {directory}")
+
+@app.command()
+def clear(directory: str = DEFAULT_DIRECTORY):
+    print(f"Removed {USFMParseCache(directory=directory).clear()} cached files from {directory}")
+
+if __name__ == "__main__":
+    app()
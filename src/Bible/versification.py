@@ -0,0 +1,68 @@
+import os
+import re
+from typing import Optional
+
+VERSIFICATION_FILENAME = "versification.txt"
+
+# (book code, chapter, verse)
+VerseKey = tuple[str, int, int]
+
+_VERSES = re.compile(r'^\s*(\w+)\s+(\d+):(\d+)(?:-(\d+))?\s*$')
+
+def parse_verses(text: str) -> list[VerseKey]:
+    """Parses "PSA 51:1" or "PSA 51:1-2" into the verses it names"""
+    match = _VERSES.match(text)
+    if match is None:
+        raise ValueError(f"not a verse or verse range: {text!r}")
+    book, chapter, start, end = match.groups()
+    return [(book.upper(), int(chapter), verse) for verse in range(int(start), int(end or start) + 1)]
+
+class Versification:
+    """Maps the verse numbers of a translation onto canonical (standard English) ones
+
+    Verses without a mapping keep their numbers.
+    """
+
+    def __init__(self, mappings: Optional[dict[VerseKey, list[VerseKey]]] = None):
+        self.mappings = mappings if mappings is not None else {}
+
+    def canonical(self, book: str, chapter: int, verse: int) -> list[VerseKey]:
+        return self.mappings.get((book, chapter, verse), [(book, chapter, verse)])
+
+    @staticmethod
+    def parse(text: str) -> "Versification":
+        """Parses mapping lines such as "PSA 51:1-2 = PSA 51:0", translation verses first
+
+        Ranges of the same length map verse by verse. A single verse may map
+        onto a range and a range onto a single verse. `#` starts a comment.
+        """
+        mappings = {} # type: dict[VerseKey, list[VerseKey]]
+        for number, line in enumerate(text.splitlines(), start=1):
+            line = line.split("#", 1)[0].strip()
+            if line == "":
+                continue
+            left, equals, right = line.partition("=")
+            if equals == "":
+                raise ValueError(f"line {number}: expected '<verses> = <canonical verses>'")
+            verses, canonical = parse_verses(left), parse_verses(right)
+
+            if len(verses) == len(canonical):
+                for verse, canonical_verse in zip(verses, canonical):
+                    mappings.setdefault(verse, []).append(canonical_verse)
+            elif len(verses) == 1:
+                mappings.setdefault(verses[0], []).extend(canonical)
+            elif len(canonical) == 1:
+                for verse in verses:
+                    mappings.setdefault(verse, []).append(canonical[0])
+            else:
+                raise ValueError(f"line {number}: ranges of {len(verses)} and {len(canonical)} verses don't map onto each other")
+        return Versification(mappings)
+
+    @staticmethod
+    def read(directory: str) -> "Versification":
+        """Reads the versification of a translation directory, which is canonical unless it has a versification file"""
+        path = os.path.join(directory, VERSIFICATION_FILENAME)
+        if not os.path.exists(path):
+            return Versification()
+        with open(path, 'r', encoding='utf-8') as file:
+            return Versification.parse(file.read())
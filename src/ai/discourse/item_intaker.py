@@ -1,41 +1,61 @@
 
-from abc import ABC, abstractmethod
 from typing import Optional
 from src.ai.discourse.discourse import DiscourseChunk, DiscourseMember
 from src.ai.discourse.ingestor import DiscourseIngestor
 
 from src.models.item import Item
 from src.models.item_ref import ItemRef
+from src.publications.items_index import ItemIndexer, ItemsIndex
 
 from tiktoken import Encoding, get_encoding
 
-class ItemsIndex(ABC):
-    @abstractmethod
-    def extend(self, item: ItemRef) -> bool:
-        pass
+class ChunkTextBuilder:
+    """The text of a chunk, from pieces joined by spaces, with a running count of its tokens
 
-    @abstractmethod
-    def to_string() -> str:
-        pass
-
-class ItemIndexer(ABC):
-    @abstractmethod
-    def index_new(self, ref: ItemRef) -> ItemsIndex:
-        pass
-
-    @abstractmethod
-    def index_child_local(self, ref: ItemRef) -> str:
-        pass
-
-    @abstractmethod
-    def index_parse(self, format: str) -> ItemsIndex:
-        pass
+    Adding a piece encodes it alone and together with the piece before it,
+    which finds the tokens merged across the space between them, instead of
+    encoding the whole text again. The pieces are joined once, when the
+    text is asked for.
+    """
+    def __init__(self, token_enc: Encoding, separator: str = " "):
+        self.token_enc = token_enc
+        self.separator = separator
+        self.pieces = [] # type: list[str]
+        self.tokens = 0
+        # Tokens of the last piece encoded alone
+        self.last_tokens = 0
+        # The counts of the last piece passed to `tokens_with`, kept for adding it
+        self.counted = None # type: tuple[str, int, int] | None
+
+    def tokens_with(self, text: str) -> int:
+        """How many tokens the text would have with `text` added"""
+        if self.counted is None or self.counted[0] is not text:
+            text_tokens = len(self.token_enc.encode(text))
+            if len(self.pieces) == 0:
+                tokens = text_tokens
+            else:
+                # Appending to the last piece changes the tokens as much as appending to the whole text
+                tokens = self.tokens - self.last_tokens + len(self.token_enc.encode(self.pieces[-1] + self.separator + text))
+            self.counted = (text, tokens, text_tokens)
+        return self.counted[1]
+
+    def add(self, text: str):
+        if len(self.pieces) == 0 and len(text) == 0:
+            return
+        self.tokens = self.tokens_with(text)
+        self.last_tokens = self.counted[2]
+        self.counted = None
+        self.pieces.append(text)
+
+    def text(self) -> str:
+        return self.separator.join(self.pieces)
 
 class ItemIntaker:
     def __init__(self, discourse_ingestor: DiscourseIngestor, item_indexer: ItemIndexer, chunk_token_limit: int = 1024, token_enc: Encoding = get_encoding("cl100k_base")):
         self.discourse_ingestor = discourse_ingestor
         self.item_indexer = item_indexer
         self.current_chunk = None # type: DiscourseChunk | None
+        self.current_text = None # type: ChunkTextBuilder | None
         self.current_index = None # type: ItemsIndex | None
         self.chunk_token_limit = chunk_token_limit
         self.token_enc = token_enc
@@ -50,17 +70,20 @@ class ItemIntaker:
         if self.current_chunk is not None:
             self.finish_current_chunk()
         self.current_chunk = DiscourseChunk(text="", communicator=communicator)
+        self.current_text = ChunkTextBuilder(self.token_enc)
         self.current_index = self.item_indexer.index_new(ref)
 
     def finish_current_chunk(self):
+        self.current_chunk.text = self.current_text.text()
         self.current_chunk.index = self.current_index.to_string()
         self.discourse_ingestor.ingest(self.current_chunk)
         self.current_chunk = None
+        self.current_text = None
         self.current_index = None
 
     def add_to_current_chunk(self, text: Optional[str], communicator: DiscourseMember, ref: ItemRef):
         if (self.current_chunk is not None and
-            text is not None and len(self.token_enc.encode(self.current_chunk.text + text)) >= self.chunk_token_limit):
+            text is not None and self.current_text.tokens_with(text) >= self.chunk_token_limit):
             self.finish_current_chunk()
 
         if self.current_chunk is None:
@@ -70,10 +93,7 @@ class ItemIntaker:
                 self.start_new_chunk(communicator=communicator, ref=ref)
         
         if text is not None:
-            if len(self.current_chunk.text) == 0:
-                self.current_chunk.text = text
-            else:
-                self.current_chunk.text += " " + text
+            self.current_text.add(text)
 
     def intake(self, item: Item, ref: ItemRef, trail: dict[int, str] = dict()):
         def intake_recursive(item: Item, ref: ItemRef, trail: dict[int, str], was_last_child_labeled: bool):
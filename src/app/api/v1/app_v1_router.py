@@ -1,5 +1,7 @@
 from fastapi import APIRouter
 from .endpoints.items.items_router import router as items_router
+from .endpoints.Bible.Bible_router import router as Bible_router
 
 router = APIRouter()
-router.include_router(items_router, prefix="/items", tags=["items"])
\ No newline at end of file
+router.include_router(items_router, prefix="/items", tags=["items"])
+router.include_router(Bible_router, prefix="/Bible", tags=["Bible"])
\ No newline at end of file
@@ -0,0 +1,28 @@
+from dataclasses import asdict
+import json
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.db.database import get_async_engine
+from src.services.verse_alignment import parallel_verses_async
+from src.services.verse_reference import VerseRange
+
+router = APIRouter()
+
+@router.get("/parallel")
+async def read_parallel(reference: str, translations: list[str] = Query(...)) -> StreamingResponse:
+    """Streams the verses of a passage in several translations side by side, one JSON line per canonical verse"""
+    try:
+        verse_range = VerseRange.parse(reference)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    async def lines():
+        # The session lives as long as the response streams
+        async with AsyncSession(get_async_engine()) as session:
+            async for verse in parallel_verses_async(session, translations, verse_range):
+                yield json.dumps(asdict(verse)) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,23 @@
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.db.database import get_async_session
+from src.models.item import ItemBulkEdit
+from src.services.item_edit import apply_item_edit_async
+
+router = APIRouter()
+
+@router.post("/bulk")
+async def bulk_edit_items(edit: ItemBulkEdit, session: AsyncSession = Depends(get_async_session)) -> dict:
+    """Creates and updates nested Items in one transaction
+
+    Returns the ids of the new Items and of the new ItemChildren, each in the
+    order they appear in the payload.
+    """
+    try:
+        result = await apply_item_edit_async(session, edit)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return asdict(result)
@@ -0,0 +1,23 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.db.database import get_async_session
+from src.models.item import Item
+from src.services.item import get_item_children_page_async
+
+router = APIRouter()
+
+@router.get("/{item_id}/children")
+async def read_item_children(
+        item_id: int,
+        after: Optional[int] = Query(None, description="The `next` of the previous page"),
+        limit: int = Query(50, ge=1, le=500),
+        session: AsyncSession = Depends(get_async_session),
+    ) -> dict:
+    """A page of an Item's children in order, for loading large parents on demand"""
+    page = await get_item_children_page_async(session, item_id, after, limit)
+    if len(page["children"]) == 0 and await session.get(Item, item_id) is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return { "item_id": item_id, **page }
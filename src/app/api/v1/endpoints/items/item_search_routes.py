@@ -0,0 +1,20 @@
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.db.database import get_async_session
+from src.services.item_search import search_items_async
+
+router = APIRouter()
+
+@router.get("/search")
+async def search(
+        q: str = Query(..., min_length=1),
+        page: int = Query(1, ge=1),
+        page_size: int = Query(20, ge=1, le=100),
+        session: AsyncSession = Depends(get_async_session),
+    ) -> dict:
+    """Items whose text has all the words of `q`, most relevant first, with the references of verses"""
+    hits = await search_items_async(session, q, limit=page_size, offset=(page - 1) * page_size)
+    return { "query": q, "page": page, "page_size": page_size, "results": [asdict(hit) for hit in hits] }
@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+import gzip
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.db.database import get_async_engine, get_async_session
+from src.services.item import get_item_subtree_version_async
+from src.services.item_cache import item_subtree_cache
+from src.services.item_snapshot import get_item_snapshot_async
+from src.services.item_stream import stream_item_subtree_async
+
+router = APIRouter()
+
+def gzip_etag(etag: str) -> str:
+    """The ETag of the gzipped form of a response, which as different bytes needs its own strong ETag"""
+    return etag[:-1] + '-gzip"'
+
+def client_etags(if_none_match: str) -> list[str]:
+    return [client_etag.strip().removeprefix("W/") for client_etag in if_none_match.split(",")]
+
+def matching_etag(etag: str, if_none_match: Optional[str]) -> Optional[str]:
+    """Which of the plain and gzipped forms' ETags the client has, if either"""
+    if if_none_match is None:
+        return None
+    etags = client_etags(if_none_match)
+    return next((candidate for candidate in (etag, gzip_etag(etag)) if candidate in etags), None)
+
+def is_not_modified(etag: str, last_modified: datetime, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    """Whether the client's copy is current, by its ETags, or by its date if it sent none"""
+    if if_none_match is not None:
+        return "*" in client_etags(if_none_match) or matching_etag(etag, if_none_match) is not None
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+def version_headers(etag: str, last_modified: datetime) -> dict[str, str]:
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True),
+    }
+
+@router.get("/{item_id}/subtree")
+async def read_item_subtree(
+        item_id: int,
+        request: Request,
+        stream: bool = False,
+        if_none_match: Optional[str] = Header(None),
+        if_modified_since: Optional[str] = Header(None),
+        session: AsyncSession = Depends(get_async_session),
+    ) -> Response:
+    """An Item with all of its descendants, nested as in ItemRead, from its snapshot or the subtree cache
+
+    Items with a snapshot, such as chapters, are answered with it as it is
+    stored, gzipped for clients that accept it. Otherwise, with `stream`, the
+    JSON is written while the subtree is read from the database, for subtrees
+    too large to build in memory or to cache. Either way, a client whose copy
+    is current is answered 304 without it.
+    """
+    snapshot = await get_item_snapshot_async(session, item_id)
+    if snapshot is not None:
+        gzipped = "gzip" in request.headers.get("accept-encoding", "")
+        headers = version_headers(gzip_etag(snapshot.etag) if gzipped else snapshot.etag, snapshot.updated_at)
+        headers["Vary"] = "Accept-Encoding"
+        if is_not_modified(snapshot.etag, snapshot.updated_at, if_none_match, if_modified_since):
+            # The client keeps the ETag of the form it has
+            headers["ETag"] = matching_etag(snapshot.etag, if_none_match) or headers["ETag"]
+            return Response(status_code=304, headers=headers)
+        if gzipped:
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=snapshot.data, media_type="application/json", headers=headers)
+        return Response(content=gzip.decompress(snapshot.data), media_type="application/json", headers=headers)
+
+    version = await get_item_subtree_version_async(session, item_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    headers = version_headers(version.etag, version.last_modified)
+    if is_not_modified(version.etag, version.last_modified, if_none_match, if_modified_since):
+        return Response(status_code=304, headers=headers)
+
+    if stream:
+        async def chunks():
+            # The session lives as long as the response streams
+            async with AsyncSession(get_async_engine()) as stream_session:
+                async for chunk in stream_item_subtree_async(stream_session, item_id):
+                    yield chunk
+
+        return StreamingResponse(chunks(), media_type="application/json", headers=headers)
+
+    subtree = await item_subtree_cache.get_async(session, item_id, version)
+    if subtree is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return Response(content=subtree, media_type="application/json", headers=headers)
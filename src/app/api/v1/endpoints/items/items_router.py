@@ -1,7 +1,15 @@
 from fastapi import APIRouter
 from .item_note_routes import router as item_note_router
 from .item_collection_routes import router as item_collection_router
+from .item_search_routes import router as item_search_router
+from .item_subtree_routes import router as item_subtree_router
+from .item_children_routes import router as item_children_router
+from .item_bulk_routes import router as item_bulk_router
 
 router = APIRouter()
 router.include_router(item_note_router, prefix="/notes", tags=["notes"])
 router.include_router(item_collection_router, prefix="/collections", tags=["collections"])
+router.include_router(item_search_router)
+router.include_router(item_subtree_router)
+router.include_router(item_children_router)
+router.include_router(item_bulk_router)
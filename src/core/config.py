@@ -1,7 +1,20 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # The async engine's URL, by default DATABASE_URL with its async driver (asyncpg or aiosqlite)
+    ASYNC_DATABASE_URL: Optional[str] = None
+    # Log every statement
+    DATABASE_ECHO: bool = False
+    # Connections kept open in each engine's pool, and how many more it may open under load
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    # Test connections before using them, to replace ones the database closed
+    DATABASE_POOL_PRE_PING: bool = True
     OPENAI_API_KEY: str
+    # Size of the serialized Item subtrees kept in each process
+    ITEM_SUBTREE_CACHE_BYTES: int = 64 * 1024 * 1024
 
 settings = Settings(_env_file='.env', _env_file_encoding='utf-8')
@@ -1,20 +1,59 @@
 from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Optional
+
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import create_engine, Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.core.config import settings  # Assuming you have a settings module for configuration
 
 DATABASE_URL = settings.DATABASE_URL  # e.g., "sqlite:///./test.db"
-engine = create_engine(DATABASE_URL, echo=True)  # Set echo=False in production
+# Drivers of the async engine by database
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+def engine_options(url: URL) -> dict[str, Any]:
+    options = { "echo": settings.DATABASE_ECHO, "pool_pre_ping": settings.DATABASE_POOL_PRE_PING } # type: dict[str, Any]
+    # SQLite's pools don't all take these
+    if url.get_backend_name() != "sqlite":
+        options.update(pool_size=settings.DATABASE_POOL_SIZE, max_overflow=settings.DATABASE_MAX_OVERFLOW)
+    return options
+
+engine = create_engine(DATABASE_URL, **engine_options(make_url(DATABASE_URL)))
+
+def async_database_url() -> URL:
+    if settings.ASYNC_DATABASE_URL is not None:
+        return make_url(settings.ASYNC_DATABASE_URL)
+    url = make_url(DATABASE_URL)
+    return url.set(drivername=f"{url.get_backend_name()}+{ASYNC_DRIVERS[url.get_backend_name()]}")
+
+_async_engine = None # type: Optional[AsyncEngine]
+
+def get_async_engine() -> AsyncEngine:
+    """The engine of the API's request handlers, created on first use so that scripts don't need its driver"""
+    global _async_engine
+    if _async_engine is None:
+        url = async_database_url()
+        _async_engine = create_async_engine(url, **engine_options(url))
+    return _async_engine
 
 @contextmanager
 def get_session():
     with Session(engine) as session:
         yield session
 
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI dependency of a session on the async engine, for handlers that shouldn't block the event loop"""
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
 def init_db():
     SQLModel.metadata.create_all(engine)
 
 # This ensures init_db() is only called when this script is run directly,
 # not when it's imported by another module.
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    init_db()
@@ -0,0 +1,19 @@
+from sqlalchemy import Text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+# Digits of the local indexes in sort keys, which order correctly as text
+SORT_KEY_DIGITS = 8
+
+class padded_index(FunctionElement):
+    """An integer column as text, zero-padded to `SORT_KEY_DIGITS` digits, in SQLite and Postgres"""
+    type = Text()
+    inherit_cache = True
+
+@compiles(padded_index)
+def compile_padded_index(element, compiler, **kwargs):
+    return f"lpad(CAST({compiler.process(element.clauses, **kwargs)} AS TEXT), {SORT_KEY_DIGITS}, '0')"
+
+@compiles(padded_index, "sqlite")
+def compile_padded_index_sqlite(element, compiler, **kwargs):
+    return f"printf('%0{SORT_KEY_DIGITS}d', {compiler.process(element.clauses, **kwargs)})"
@@ -1,8 +1,282 @@
-from src.Bible.usfm import read_Bible_USFM
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+import os
+import queue
+import threading
+import time
+from typing import Optional, Sequence
+
+import typer
+from sqlmodel import select
+
+from src.Bible.usfm import USFMReadError, read_Bible
+from src.Bible.usfm_cache import USFMParseCache
+from src.Bible.versification import Versification
+from src.db.database import get_session
+from src.models.item import Item
+from src.models.item_import import ItemImportSource
+from src.services.item_bulk import BulkInsertResult, ItemTreeRows, flatten_item_tree, flattened_item_rows, insert_item_tree_rows
+from src.services.item_import import ItemSyncResult, source_hash, sync_books
+from src.services.item_snapshot import BOOK_DEPTH, CHAPTER_DEPTH, build_item_snapshots
+from src.services.verse_alignment import TRANSLATIONS_DIRECTORY, align_book_verses, delete_book_alignments
+from src.services.verse_reference import book_code, delete_book_verses, index_book_verses
+
+TITLES = {
+    "ASV": "American Standard Version",
+}
+# Front matter and introductions, which read_Bible doesn't take
+SKIP_BOOKS = ["FRT", "INT"]
+DEFAULT_QUEUE_SIZE = 2
+
+@dataclass
+class ParsedTranslation:
+    directory: str
+    title: str
+    rows: ItemTreeRows
+    # (filename, source hash) of each book file
+    sources: list[tuple[str, str]]
+    # Positions in `rows.items` of the book read from each file
+    books: dict[str, int]
+    source_bytes: int
+    parse_seconds: float
+
+def translation_filenames(directory: str) -> tuple[list[str], list[str]]:
+    """Splits the `.usfm` files of a translation into books to read and files to skip
+
+    Filenames are expected to be laid out as `<number>-<book code><language>-<translation>.usfm`.
+    """
+    books = [] # type: list[str]
+    skip = [] # type: list[str]
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".usfm"):
+            continue
+        (skip if filename[3:6] in SKIP_BOOKS else books).append(filename)
+    return books, skip
+
+def translation_name(directory: str) -> str:
+    return os.path.basename(os.path.normpath(directory))
+
+def translation_sources(directory: str, filenames: list[str]) -> list[tuple[str, str]]:
+    sources = [] # type: list[tuple[str, str]]
+    for filename in filenames:
+        with open(os.path.join(directory, filename), 'rb') as file:
+            sources.append((filename, source_hash(file.read())))
+    return sources
+
+def parse_translation(directory: str, cache: Optional[USFMParseCache] = None) -> ParsedTranslation:
+    """Reads a translation into the rows of its Items, so that they can be sent back from a worker"""
+    start = time.perf_counter()
+
+    name = translation_name(directory)
+    title = TITLES.get(name, name)
+    filenames, skip = translation_filenames(directory)
+
+    books = {} # type: dict[str, Item]
+    Bible = read_Bible(directory, None, title, books=books, skip=skip, cache=cache)
+    items, _ = flatten_item_tree(Bible)
+    positions = { id(item): index for index, item in enumerate(items) }
+
+    return ParsedTranslation(
+        directory=directory,
+        title=title,
+        rows=flattened_item_rows(items),
+        sources=translation_sources(directory, filenames),
+        books={ filename: positions[id(book)] for filename, book in books.items() },
+        source_bytes=sum(os.path.getsize(os.path.join(directory, filename)) for filename in filenames),
+        parse_seconds=time.perf_counter() - start,
+    )
+
+def save_translation(translation: ParsedTranslation, snapshot_depths: Sequence[int] = (CHAPTER_DEPTH,)) -> BulkInsertResult:
+    """Saves a parsed translation as a new Item tree, recording its source files and verses, in one transaction
+
+    Snapshots are built of the Items `snapshot_depths` levels below its root.
+    """
+    name = translation_name(translation.directory)
+    versification = Versification.read(translation.directory)
+
+    with get_session() as session:
+        result = insert_item_tree_rows(session, translation.rows, commit=False)
+        for filename, hash in translation.sources:
+            position = translation.books.get(filename)
+            item_id = translation.rows.items[position]["id"] if position is not None else None
+            session.add(ItemImportSource(translation=name, root_id=result.root_id, filename=filename, source_hash=hash, item_id=item_id))
+            if item_id is not None:
+                # Alignments of an earlier import go with the references they were made from
+                delete_book_alignments(session, name, book_code(filename))
+                index_book_verses(session, name, book_code(filename), item_id)
+                align_book_verses(session, name, book_code(filename), versification)
+        build_item_snapshots(session, result.root_id, snapshot_depths, commit=False)
+        session.commit()
+    return result
+
+def sync_translation(directory: str, cache: Optional[USFMParseCache] = None, snapshot_depths: Sequence[int] = (CHAPTER_DEPTH,)) -> Optional[ItemSyncResult]:
+    """Updates the last import of a translation to match its files, reading only the files that changed
+
+    The snapshots of changed Items are rebuilt as the changes are committed,
+    and those of new Items are built afterwards. Returns None if the
+    translation was never imported (with its sources recorded).
+    """
+    name = translation_name(directory)
+    filenames, skip = translation_filenames(directory)
+
+    with get_session() as session:
+        root_id = session.exec(
+            select(ItemImportSource.root_id).where(ItemImportSource.translation == name).order_by(ItemImportSource.id.desc()).limit(1)
+        ).first()
+        if root_id is None:
+            return None
+        root = session.get(Item, root_id)
+
+        stored = dict(session.exec(
+            select(ItemImportSource.filename, ItemImportSource.source_hash).where(ItemImportSource.root_id == root_id)
+        ).all())
+        sources = translation_sources(directory, filenames)
+        changed = [filename for filename, hash in sources if stored.get(filename) != hash]
+        removed = [filename for filename in stored if filename not in filenames]
+
+        books = {} # type: dict[str, Item]
+        if len(changed) > 0:
+            unchanged = [filename for filename in filenames if filename not in changed]
+            read_Bible(directory, None, root.text, books=books, skip=skip + unchanged, cache=cache)
+
+        # Delete references before the Items they refer to
+        for filename in changed + removed:
+            delete_book_alignments(session, name, book_code(filename))
+            delete_book_verses(session, name, book_code(filename))
+
+        result = sync_books(session, root, name, sources, books)
+
+        book_ids = dict(session.exec(
+            select(ItemImportSource.filename, ItemImportSource.item_id).where(ItemImportSource.root_id == root_id)
+        ).all())
+        versification = Versification.read(directory)
+        for filename in changed:
+            if book_ids.get(filename) is not None:
+                index_book_verses(session, name, book_code(filename), book_ids[filename])
+                align_book_verses(session, name, book_code(filename), versification)
+
+        session.commit()
+        build_item_snapshots(session, root_id, snapshot_depths)
+
+    print(f"{name} ({root_id}): {len(changed)} of {len(filenames)} files changed, {result}")
+    return result
+
+def import_translations(directories: list[str], workers: Optional[int] = None, queue_size: int = DEFAULT_QUEUE_SIZE, cache: Optional[USFMParseCache] = None, incremental: bool = True, snapshot_depths: Sequence[int] = (CHAPTER_DEPTH,)) -> bool:
+    """Imports translations, each in its own transaction, returning whether all of them were imported
+
+    With `incremental`, translations imported before are updated in place
+    from the files that changed, keeping the ids of unchanged Items.
+
+    The other translations are parsed across a process pool while a writer
+    thread saves the ones already parsed. At most `queue_size` parsed
+    translations wait for the writer, and a translation is only submitted
+    once fewer than `workers + queue_size` are being parsed or waiting to be
+    queued, which bounds memory when parsing outpaces writing.
+
+    A translation that fails to parse or save is reported and left out,
+    without stopping the others.
+    """
+    start = time.perf_counter()
+    failures = {} # type: dict[str, Exception]
+
+    if incremental:
+        remaining = [] # type: list[str]
+        for directory in directories:
+            try:
+                if sync_translation(directory, cache, snapshot_depths) is None:
+                    remaining.append(directory)
+            except Exception as error:
+                failures[directory] = error
+                print(f"{directory}: failed to {'parse' if isinstance(error, USFMReadError) else 'update'}: {error}")
+        synced = len(directories) - len(remaining) - len(failures)
+        directories = remaining
+    else:
+        synced = 0
+
+    parsed = queue.Queue(maxsize=queue_size) # type: queue.Queue[Optional[ParsedTranslation]]
+    results = [] # type: list[tuple[ParsedTranslation, BulkInsertResult]]
+
+    def write():
+        while True:
+            translation = parsed.get()
+            if translation is None:
+                return
+            try:
+                result = save_translation(translation, snapshot_depths)
+                results.append((translation, result))
+                print(f"{translation.title} ({result.root_id}): {result}")
+            except Exception as error:
+                # Keep draining the queue, so that the parsing side never blocks on it
+                failures[translation.directory] = error
+                print(f"{translation.title}: failed to save: {error}")
+
+    writer = threading.Thread(target=write, name="translation writer")
+    writer.start()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # A finished future holds its parsed translation, so only so many are submitted ahead of the writer
+            in_flight = (workers or os.cpu_count() or 1) + queue_size
+            pending = list(reversed(directories))
+            futures = {} # type: dict[Future, str]
+            while len(pending) > 0 or len(futures) > 0:
+                while len(pending) > 0 and len(futures) < in_flight:
+                    directory = pending.pop()
+                    futures[executor.submit(parse_translation, directory, cache)] = directory
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                while len(done) > 0:
+                    future = done.pop()
+                    directory = futures.pop(future)
+                    try:
+                        translation = future.result()
+                    except Exception as error:
+                        failures[directory] = error
+                        print(f"{directory}: failed to parse: {error}")
+                        continue
+                    print(f"{translation.title}: parsed {len(translation.rows.items)} items in {translation.parse_seconds:.2f}s")
+                    parsed.put(translation)
+    finally:
+        parsed.put(None)
+        writer.join()
+
+    seconds = time.perf_counter() - start
+    rows = sum(result.rows for _, result in results)
+    source_bytes = sum(translation.source_bytes for translation, _ in results)
+    if synced > 0:
+        print(f"Updated {synced} translations imported before")
+    print(
+        f"Imported {len(results)} of {len(directories)} new translations: {rows} rows in {seconds:.2f}s "
+        f"({rows / seconds:,.0f} rows/s, {source_bytes / 1e6 / seconds:.2f} MB/s of USFM)"
+    )
+    print(
+        f"Parsing took {sum(translation.parse_seconds for translation, _ in results):.2f}s and writing "
+        f"{sum(result.seconds for _, result in results):.2f}s of worker and writer time"
+    )
+
+    return len(failures) == 0
 
 def import_ASV():
-    result = read_Bible_USFM("content/Bible/ASV", skip=["00-FRTeng-asv.usfm", "01-INTeng-asv.usfm"])
-    print(result)
+    import_translations([os.path.join(TRANSLATIONS_DIRECTORY, "ASV")], cache=USFMParseCache())
+
+app = typer.Typer()
+
+@app.command()
+def main(
+        directories: Optional[list[str]] = typer.Argument(None, help="Translation directories, all of those in content/Bible by default"),
+        workers: Optional[int] = typer.Option(None, help="Parsing processes, one per CPU by default"),
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        cache: bool = True,
+        incremental: bool = typer.Option(True, help="Update translations imported before instead of importing them again"),
+        book_snapshots: bool = typer.Option(False, help="Snapshot whole books as well as chapters"),
+    ):
+    """Imports Bible translations laid out as `<directory>/<book>.usfm`"""
+    if not directories:
+        directories = [os.path.join(TRANSLATIONS_DIRECTORY, name) for name in sorted(os.listdir(TRANSLATIONS_DIRECTORY))]
+
+    snapshot_depths = (BOOK_DEPTH, CHAPTER_DEPTH) if book_snapshots else (CHAPTER_DEPTH,)
+    if not import_translations(directories, workers=workers, queue_size=queue_size, cache=USFMParseCache() if cache else None, incremental=incremental, snapshot_depths=snapshot_depths):
+        raise typer.Exit(code=1)
 
 if __name__ == "__main__":
-    import_ASV()
+    app()
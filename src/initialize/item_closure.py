@@ -0,0 +1,19 @@
+import time
+
+import typer
+
+from src.db.database import get_session
+from src.services.item_closure import rebuild_item_closure
+
+app = typer.Typer()
+
+@app.command()
+def main():
+    """Rebuilds the Item closure table from ItemChild, such as for Items saved before it was kept"""
+    start = time.perf_counter()
+    with get_session() as session:
+        rows = rebuild_item_closure(session)
+    print(f"Rebuilt the Item closure: {rows} rows in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    app()
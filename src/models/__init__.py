@@ -1,2 +1,7 @@
 from .item_ref import ItemRef
-from .item import Item, ItemChild, ItemChildrenDisplayClass, ItemReference, ItemChildReference, ItemCreate, ItemChildCreate, ItemRead, ItemChildRead, ItemUpdate, ItemChildUpdate, ItemChildRemove, ITEM_TEXT_DELETE
\ No newline at end of file
+from .item import Item, ItemChild, ItemChildrenDisplayClass, ItemReference, ItemChildReference, ItemCreate, ItemChildCreate, ItemRead, ItemChildRead, ItemUpdate, ItemChildUpdate, ItemChildRemove, ITEM_TEXT_DELETE, item_content_hash
+from .item_import import ItemImportSource
+from .verse_reference import VerseReference, VerseAlignment, SUPERSCRIPT_VERSE
+from .item_closure import ItemClosure
+from .item_search import ITEM_FTS_TABLE, create_item_search_index
+from .item_snapshot import ItemSnapshot
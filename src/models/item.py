@@ -1,11 +1,13 @@
 # Base Item Model
 from datetime import datetime
 from enum import Enum
-from typing import Optional, Union
+import hashlib
+from typing import Iterable, Optional, Union
 from pydantic import BaseModel
 
 from sqlmodel import Field, Relationship, SQLModel
-from sqlalchemy import event
+from sqlalchemy import Index, event, inspect
+from sqlalchemy.orm import object_session
 
 class ItemChildrenDisplayClass(str, Enum):
     INLINE = 'INLINE'
@@ -29,10 +31,22 @@ class Item(SQLModel, table=True):
 
     children_display_class: ItemChildrenDisplayClass = Field(default=ItemChildrenDisplayClass.BLOCK)
 
+    # Hash of the text and display class with the labels and hashes of the children, set on import
+    content_hash: Optional[str] = Field(default=None)
+
+    # Moved on, with when, by each transaction changing the Item or anything under it, to tell versions of its subtree apart
+    subtree_version: int = Field(default=0)
+    subtree_updated_at: datetime = Field(default_factory=datetime.utcnow)
+
     children: list["ItemChild"] = Relationship(back_populates='parent', sa_relationship_kwargs={"foreign_keys": "ItemChild.parent_id"})
     containing_item_child: list["ItemChild"] = Relationship(back_populates="child", sa_relationship_kwargs={"foreign_keys": "ItemChild.child_id"})
 
 class ItemChild(SQLModel, table=True):
+    __table_args__ = (
+        # Lists a parent's children in order, from any position
+        Index("ix_itemchild_parent_local_index", "parent_id", "local_index"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     added_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -44,12 +58,25 @@ class ItemChild(SQLModel, table=True):
     parent_id: Optional[int] = Field(default=None, foreign_key='item.id')
     child_id: int = Field(foreign_key='item.id')
 
+    # Made by an import, which changes or removes it when importing again, where it leaves other links alone
+    imported: bool = Field(default=False)
+
     parent: Optional[Item] = Relationship(back_populates='children', sa_relationship_kwargs={"foreign_keys": "[ItemChild.parent_id]"})
     child: Item = Relationship(back_populates='containing_item_child', sa_relationship_kwargs={"foreign_keys": "[ItemChild.child_id]"})
 
     # parent: Optional[Item] = Relationship(back_populates='children', foreign_keys=[parent_id])
     # child: Item = Relationship(back_populates='containing_item_child', foreign_keys=[child_id])
 
+def item_content_hash(text: Optional[str], children_display_class: ItemChildrenDisplayClass, children: Iterable[tuple[Optional[str], Optional[str]]]) -> str:
+    """Hashes an Item's content together with the (label, content hash) of each of its children in order"""
+    digest = hashlib.sha256()
+    for part in [text, children_display_class.name]:
+        digest.update(b"\0" if part is None else f"\1{len(part)}:{part}".encode('utf-8'))
+    for label, content_hash in children:
+        for part in [label, content_hash]:
+            digest.update(b"\0" if part is None else f"\1{len(part)}:{part}".encode('utf-8'))
+    return digest.hexdigest()
+
 # Listener function to update `updated_at` before commit
 def before_update_listener(mapper, connection, target):
     target.updated_at = datetime.utcnow()
@@ -58,6 +85,27 @@ def before_update_listener(mapper, connection, target):
 event.listen(Item, 'before_update', before_update_listener)
 event.listen(ItemChild, 'before_update', before_update_listener)
 
+# `Session.info` key of the ids of the Items changed in a session, whose subtrees (and their ancestors') changed with them
+CHANGED_ITEM_IDS = "changed_item_ids"
+
+def record_changed_items(target: Union[Item, ItemChild], item_ids: Iterable[Optional[int]]):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(CHANGED_ITEM_IDS, set()).update(item_id for item_id in item_ids if item_id is not None)
+
+def item_changed_listener(mapper, connection, target: Item):
+    record_changed_items(target, [target.id])
+
+def item_child_changed_listener(mapper, connection, target: ItemChild):
+    # A link moved to another parent changes the one it left as well
+    record_changed_items(target, [target.parent_id, *inspect(target).attrs.parent_id.history.deleted])
+
+event.listen(Item, 'before_update', item_changed_listener)
+event.listen(Item, 'before_delete', item_changed_listener)
+event.listen(ItemChild, 'after_insert', item_child_changed_listener)
+event.listen(ItemChild, 'before_update', item_child_changed_listener)
+event.listen(ItemChild, 'after_delete', item_child_changed_listener)
+
 class ItemReference(BaseModel):
     id: int
 
@@ -69,8 +117,9 @@ class ItemChildCreate(BaseModel):
     child: Union[ItemReference, "ItemCreate"]
 
 class ItemCreate(BaseModel):
-    text: Optional[str]
-    children_display_class: Optional[ItemChildrenDisplayClass]
+    text: Optional[str] = None
+    children_display_class: Optional[ItemChildrenDisplayClass] = None
+    # An ItemChildReference moves that ItemChild here
     children: list[ItemChildReference | ItemChildCreate]
 
 class ItemChildRead(BaseModel):
@@ -88,18 +137,26 @@ class ItemRead(BaseModel):
     text: Optional[str]
     children: list[ItemChildRead]
 
+# Fields left out of an update are left unchanged
 class ItemChildUpdate(BaseModel):
     id: int
-    local_index: Optional[int]
-    label: Optional[str]
-    child: Optional[Union[ItemCreate, "ItemUpdate"]]
+    local_index: Optional[int] = None
+    label: Optional[str] = None
+    # An ItemCreate replaces the child, where an ItemUpdate changes it
+    child: Optional[Union[ItemCreate, "ItemUpdate"]] = None
 
 class ItemUpdate(BaseModel):
-    text: Optional[str]
-    child_display_class: Optional[ItemChildrenDisplayClass]
-    children_create: Optional[list[ItemChildCreate]]
-    children_update: Optional[list[ItemChildUpdate]]
-    children_remove: Optional[list["ItemChildRemove"]]
+    text: Optional[str] = None
+    child_display_class: Optional[ItemChildrenDisplayClass] = None
+    # Added after the existing children
+    children_create: Optional[list[ItemChildCreate]] = None
+    children_update: Optional[list[ItemChildUpdate]] = None
+    children_remove: Optional[list["ItemChildRemove"]] = None
 
 class ItemChildRemove(BaseModel):
     id: int
+
+class ItemBulkEdit(BaseModel):
+    """New trees of Items, and updates of saved Items by id, applied together"""
+    create: list[ItemCreate] = []
+    update: dict[int, ItemUpdate] = {}
@@ -0,0 +1,103 @@
+from typing import Optional
+
+from sqlalchemy import Connection, Index, Table, and_, case, delete, event, insert, inspect, literal, or_, select, true
+from sqlmodel import Field, SQLModel
+
+from src.db.functions import SORT_KEY_DIGITS
+from src.models.item import Item, ItemChild
+
+class ItemClosure(SQLModel, table=True):
+    """A path from an Item down to one of its descendants (or itself), to read subtrees in one query
+
+    `sort_key` is the `local_index` of each ItemChild along the path,
+    zero-padded and concatenated, so that a subtree ordered by it is in
+    document order. An Item linked more than once below an ancestor has a
+    row for each path to it, told apart by the last ItemChild on the path
+    (`item_child_id`, None for an Item's own row). Rows are kept up to date
+    by the listeners below and by the bulk inserts of `src.services.item_bulk`.
+    """
+    __table_args__ = (
+        # Covers subtrees in document order, with or without a depth limit
+        Index("ix_itemclosure_subtree", "ancestor_id", "sort_key", "depth", "descendant_id"),
+        Index("ix_itemclosure_ancestors", "descendant_id", "depth", "ancestor_id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+
+    ancestor_id: int = Field(foreign_key='item.id')
+    descendant_id: int = Field(foreign_key='item.id')
+    depth: int
+    sort_key: str
+    item_child_id: Optional[int] = Field(default=None, foreign_key='itemchild.id')
+
+def closure_sort_key(local_index: int) -> str:
+    """The part of a sort key for one ItemChild, as `padded_index` gives in SQL"""
+    return f"{local_index:0{SORT_KEY_DIGITS}d}"
+
+def item_closure_table() -> Table:
+    return ItemClosure.__table__
+
+def link_item_closure(connection: Connection, item_child_id: int, parent_id: int, child_id: int, local_index: int):
+    """Adds the paths through a new ItemChild: from each ancestor of its parent to each descendant of its child"""
+    closure = item_closure_table()
+    above = closure.alias("above")
+    below = closure.alias("below")
+    connection.execute(insert(closure).from_select(
+        ["ancestor_id", "descendant_id", "depth", "sort_key", "item_child_id"],
+        select(
+            above.c.ancestor_id,
+            below.c.descendant_id,
+            above.c.depth + below.c.depth + 1,
+            above.c.sort_key + literal(closure_sort_key(local_index)) + below.c.sort_key,
+            case((below.c.depth == 0, literal(item_child_id)), else_=below.c.item_child_id),
+        ).select_from(above.join(below, true())).where(above.c.descendant_id == parent_id, below.c.ancestor_id == child_id),
+    ))
+
+def unlink_item_closure(connection: Connection, parent_id: int, child_id: int, local_index: int):
+    """Removes the paths through an ItemChild, leaving those through other links between the same Items"""
+    closure = item_closure_table()
+    above = closure.alias("above")
+    below = closure.alias("below")
+    paths = (
+        select(closure.c.id)
+        .join(above, and_(above.c.ancestor_id == closure.c.ancestor_id, above.c.descendant_id == parent_id))
+        .join(below, and_(below.c.descendant_id == closure.c.descendant_id, below.c.ancestor_id == child_id))
+        .where(closure.c.sort_key == above.c.sort_key + literal(closure_sort_key(local_index)) + below.c.sort_key)
+    )
+    connection.execute(delete(closure).where(closure.c.id.in_(paths)))
+
+def item_after_insert(mapper, connection, target: Item):
+    connection.execute(insert(item_closure_table()).values(ancestor_id=target.id, descendant_id=target.id, depth=0, sort_key=""))
+
+def item_before_delete(mapper, connection, target: Item):
+    closure = item_closure_table()
+    connection.execute(delete(closure).where(or_(closure.c.ancestor_id == target.id, closure.c.descendant_id == target.id)))
+
+def item_child_after_insert(mapper, connection, target: ItemChild):
+    if target.parent_id is not None:
+        link_item_closure(connection, target.id, target.parent_id, target.child_id, target.local_index)
+
+def item_child_after_update(mapper, connection, target: ItemChild):
+    state = inspect(target)
+    old = {} # type: dict[str, object]
+    for name in ["parent_id", "child_id", "local_index"]:
+        history = state.attrs[name].history
+        if history.has_changes():
+            old[name] = history.deleted[0] if history.deleted else None
+    if len(old) == 0:
+        return
+
+    parent_id = old.get("parent_id", target.parent_id)
+    if parent_id is not None:
+        unlink_item_closure(connection, parent_id, old.get("child_id", target.child_id), old.get("local_index", target.local_index))
+    item_child_after_insert(mapper, connection, target)
+
+def item_child_before_delete(mapper, connection, target: ItemChild):
+    if target.parent_id is not None:
+        unlink_item_closure(connection, target.parent_id, target.child_id, target.local_index)
+
+event.listen(Item, 'after_insert', item_after_insert)
+event.listen(Item, 'before_delete', item_before_delete)
+event.listen(ItemChild, 'after_insert', item_child_after_insert)
+event.listen(ItemChild, 'after_update', item_child_after_update)
+event.listen(ItemChild, 'before_delete', item_child_before_delete)
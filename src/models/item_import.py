@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+class ItemImportSource(SQLModel, table=True):
+    """A source file imported under an Item, to tell which files changed when importing it again"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    imported_at: datetime = Field(default_factory=datetime.utcnow)
+
+    # Translation directory name, e.g. "ASV"
+    translation: str = Field(index=True)
+    root_id: int = Field(foreign_key='item.id', index=True)
+    filename: str
+    source_hash: str
+
+    # The Item the file was read into, if any
+    item_id: Optional[int] = Field(default=None, foreign_key='item.id')
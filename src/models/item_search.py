@@ -0,0 +1,37 @@
+from sqlalchemy import Connection, event, text
+from sqlmodel import SQLModel
+
+# Full-text index of Item.text: an FTS5 table on SQLite, kept current by triggers
+ITEM_FTS_TABLE = "item_fts"
+# and a GIN index over the text's tsvector on Postgres
+ITEM_TEXT_SEARCH_INDEX = "ix_item_text_search"
+TEXT_SEARCH_CONFIGURATION = "english"
+
+def item_text_search_vector() -> str:
+    """The expression indexed on Postgres, which searches have to repeat to use the index"""
+    return f"to_tsvector('{TEXT_SEARCH_CONFIGURATION}'::regconfig, coalesce(item.text, ''))"
+
+def create_item_search_index(connection: Connection):
+    """Creates the full-text index of Item.text if it doesn't exist, filling it from the Items already saved"""
+    if connection.dialect.name == "sqlite":
+        exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": ITEM_FTS_TABLE}).first() is not None
+        if exists:
+            return
+        connection.execute(text(f"CREATE VIRTUAL TABLE {ITEM_FTS_TABLE} USING fts5(text, content='item', content_rowid='id', tokenize='porter unicode61')"))
+        connection.execute(text(f"""CREATE TRIGGER {ITEM_FTS_TABLE}_insert AFTER INSERT ON item BEGIN
+            INSERT INTO {ITEM_FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END"""))
+        connection.execute(text(f"""CREATE TRIGGER {ITEM_FTS_TABLE}_delete AFTER DELETE ON item BEGIN
+            INSERT INTO {ITEM_FTS_TABLE}({ITEM_FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+        END"""))
+        connection.execute(text(f"""CREATE TRIGGER {ITEM_FTS_TABLE}_update AFTER UPDATE OF text ON item BEGIN
+            INSERT INTO {ITEM_FTS_TABLE}({ITEM_FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO {ITEM_FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END"""))
+        connection.execute(text(f"INSERT INTO {ITEM_FTS_TABLE}({ITEM_FTS_TABLE}) VALUES ('rebuild')"))
+    elif connection.dialect.name == "postgresql":
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {ITEM_TEXT_SEARCH_INDEX} ON item USING gin ({item_text_search_vector()})"))
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def after_create(target, connection: Connection, **kwargs):
+    create_item_search_index(connection)
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from sqlalchemy import delete, event
+from sqlmodel import Field, SQLModel
+
+from src.models.item import Item
+
+class ItemSnapshot(SQLModel, table=True):
+    """An Item's subtree rendered ahead of time as gzipped JSON, for Items read often and rarely changed, such as chapters
+
+    `src.services.item_snapshot` rebuilds snapshots when their subtrees change.
+    The ETag and `updated_at` are those of the subtree when it was rendered.
+    """
+    item_id: int = Field(primary_key=True, foreign_key='item.id')
+    data: bytes
+    etag: str
+    updated_at: datetime
+    built_at: datetime = Field(default_factory=datetime.utcnow)
+
+def item_before_delete(mapper, connection, target: Item):
+    connection.execute(delete(ItemSnapshot.__table__).where(ItemSnapshot.__table__.c.item_id == target.id))
+
+event.listen(Item, 'before_delete', item_before_delete)
@@ -0,0 +1,52 @@
+from typing import Optional
+
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+SUPERSCRIPT_VERSE = 0
+
+class VerseReference(SQLModel, table=True):
+    """Where a verse of a translation is, to look it up without walking the Item tree
+
+    A verse split across paragraphs has an Item (`part`) in each. Superscripts
+    are verse 0 of their chapter.
+    """
+    __table_args__ = (
+        # Covers lookups of verses and ranges, so that they never read the table itself
+        Index("ix_versereference_lookup", "translation", "book", "chapter", "verse", "part", "item_id", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+
+    # Translation directory name, e.g. "ASV"
+    translation: str
+    # USFM book code, e.g. "JHN"
+    book: str
+    chapter: int
+    verse: int
+    part: int = 0
+
+    item_id: int = Field(foreign_key='item.id')
+
+class VerseAlignment(SQLModel, table=True):
+    """A verse Item of a translation at a canonical verse, to read translations side by side
+
+    Translations numbering verses differently are mapped onto canonical verses
+    by their versification. A translation may have several Items (`part`s) at
+    one canonical verse.
+    """
+    __table_args__ = (
+        Index("ix_versealignment_lookup", "book", "chapter", "verse", "translation", "part", "item_id", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+
+    # Canonical verse
+    book: str
+    chapter: int
+    verse: int
+
+    translation: str
+    part: int = 0
+
+    item_id: int = Field(foreign_key='item.id')
@@ -0,0 +1,25 @@
+from abc import ABC, abstractmethod
+
+from src.models.item_ref import ItemRef
+
+class ItemsIndex(ABC):
+    @abstractmethod
+    def extend(self, item: ItemRef) -> bool:
+        pass
+
+    @abstractmethod
+    def to_string() -> str:
+        pass
+
+class ItemIndexer(ABC):
+    @abstractmethod
+    def index_new(self, ref: ItemRef) -> ItemsIndex:
+        pass
+
+    @abstractmethod
+    def index_child_local(self, ref: ItemRef) -> str:
+        pass
+
+    @abstractmethod
+    def index_parse(self, format: str) -> ItemsIndex:
+        pass
@@ -1,6 +1,6 @@
 from typing import Optional
 from pydantic import BaseModel
-from src.ai.discourse.item_intaker import ItemIndexer, ItemsIndex
+from src.publications.items_index import ItemIndexer, ItemsIndex
 from src.db.database import get_session
 from src.models.item import Item
 from src.models.item_ref import ItemRef
@@ -184,6 +184,8 @@ class PublicationItemsIndexer(ItemIndexer):
     def __init__(self, settings: PublicationIndexSettings):
         super().__init__()
         self.settings = settings
+        # Publication names by root Item id, looked up once for all the Items under it
+        self.names = {} # type: dict[int, str]
 
     def index_new(self, ref: ItemRef) -> ItemsIndex:
         name: str
@@ -191,8 +193,10 @@ class PublicationItemsIndexer(ItemIndexer):
         chapter: Optional[str]
         subchapter: Optional[str]
 
-        with get_session() as session:
-            name = next(iter(get_items(ItemRef(root=id, path=self.settings.reference_settings.name_path), session=session))).text
+        if id not in self.names:
+            with get_session() as session:
+                self.names[id] = next(iter(get_items(ItemRef(root=id, path=self.settings.reference_settings.name_path), session=session, columns=[Item.text]))).text
+        name = self.names[id]
         
         chapter = ref.path[self.settings.reference_settings.chapter_level] if ref.path is not None and self.settings.reference_settings.chapter_level < len(ref.path) else None
         subchapter = ref.path[self.settings.reference_settings.subchapter_level] if ref.path is not None and self.settings.reference_settings.subchapter_level < len(ref.path) else None
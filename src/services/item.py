@@ -1,29 +1,251 @@
-from typing import Generator, Optional
-from sqlmodel import Session, or_, select
+from dataclasses import dataclass
+from datetime import datetime
+import hashlib
+from typing import Any, Generator, Optional
+
+from sqlalchemy import Integer, Select, Text, and_, case, cast, column, exists, func, literal, or_, values
+from sqlalchemy.engine import Row
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.db.functions import padded_index
 from src.models.item import Item, ItemChild
+from src.models.item_closure import ItemClosure
 from src.models.item_ref import ItemRef
 
+# Async versions of these services run the same queries on an AsyncSession
+
+def absolute_item_ids_query(item_refs: list[ItemRef]) -> Optional[Select]:
+    """The query of `get_absolute_item_ids_batch`, or None if no ItemRef has a path to follow"""
+    paths = [item_ref.path or [] for item_ref in item_refs]
+    if all(len(path) == 0 for path in paths):
+        return None
+
+    refs = values(
+        column("ref_index", Integer), column("root_id", Integer), column("length", Integer), name="refs",
+    ).data([(index, item_ref.root, len(path)) for index, (item_ref, path) in enumerate(zip(item_refs, paths))]).cte("refs")
+    segments = values(
+        column("ref_index", Integer), column("position", Integer), column("label", Text), name="segments",
+    ).data([(index, position, label) for index, path in enumerate(paths) for position, label in enumerate(path)]).cte("segments")
+
+    walk = select(
+        refs.c.ref_index,
+        refs.c.root_id.label("item_id"),
+        literal(0, Integer).label("depth"),
+        cast(literal(""), Text).label("sort_key"),
+    ).cte("walk", recursive=True)
+
+    link = ItemChild.__table__.alias("link")
+    walk = walk.union_all(
+        select(
+            walk.c.ref_index,
+            link.c.child_id,
+            case((link.c.label.is_(None), walk.c.depth), else_=walk.c.depth + 1),
+            walk.c.sort_key + padded_index(link.c.local_index),
+        )
+        .select_from(walk)
+        .join(refs, refs.c.ref_index == walk.c.ref_index)
+        .join(link, link.c.parent_id == walk.c.item_id)
+        .outerjoin(segments, and_(segments.c.ref_index == walk.c.ref_index, segments.c.position == walk.c.depth))
+        .where(walk.c.depth < refs.c.length, or_(link.c.label.is_(None), link.c.label == segments.c.label))
+    )
+
+    return (
+        select(walk.c.ref_index, walk.c.item_id)
+        .join(refs, refs.c.ref_index == walk.c.ref_index)
+        .where(walk.c.depth == refs.c.length)
+        .order_by(walk.c.ref_index, walk.c.sort_key)
+    )
+
+def group_absolute_item_ids(item_refs: list[ItemRef], rows: list[Row]) -> list[list[int]]:
+    item_ids = [[] for _ in item_refs] # type: list[list[int]]
+    seen = [set() for _ in item_refs] # type: list[set[int]]
+    for ref_index, item_id in rows:
+        # An Item linked more than once along the way is listed once
+        if item_id not in seen[ref_index]:
+            seen[ref_index].add(item_id)
+            item_ids[ref_index].append(item_id)
+    return item_ids
+
+def get_absolute_item_ids_batch(item_refs: list[ItemRef], session: Session) -> list[list[int]]:
+    """Resolves each ItemRef to the ids of the Items its path leads to, in reading order, with one query
+
+    A path segment is matched by a child with that label. Unlabeled children
+    are passed through without taking a segment, as `ItemRef.extend` leaves
+    them out of paths, so "chapter/verse" finds verses within paragraphs.
+    """
+    query = absolute_item_ids_query(item_refs)
+    if query is None:
+        return [[item_ref.root] for item_ref in item_refs]
+    return group_absolute_item_ids(item_refs, session.exec(query).all())
+
+async def get_absolute_item_ids_batch_async(item_refs: list[ItemRef], session: AsyncSession) -> list[list[int]]:
+    query = absolute_item_ids_query(item_refs)
+    if query is None:
+        return [[item_ref.root] for item_ref in item_refs]
+    return group_absolute_item_ids(item_refs, (await session.exec(query)).all())
+
 def get_absolute_item_ids(item_ref: ItemRef, session: Session) -> Generator[int, None, None]:
-    if item_ref.path is not None and len(item_ref.path) > 0:
-        result = session.exec(
-            select(ItemChild.child_id).where(
-                ItemChild.parent_id == item_ref.root,
-                or_(
-                    ItemChild.label == item_ref.path[0],
-                    ItemChild.label == None
-                )
-            )
+    yield from get_absolute_item_ids_batch([item_ref], session)[0]
+
+async def get_absolute_item_ids_async(item_ref: ItemRef, session: AsyncSession) -> list[int]:
+    return (await get_absolute_item_ids_batch_async([item_ref], session))[0]
+
+# Ids in each IN query, within the bound parameter limits of SQLite and Postgres
+GET_ITEMS_BATCH_SIZE = 1000
+
+def items_by_ids_queries(item_ids: list[int], columns: Optional[list[Any]] = None) -> Generator[Select, None, None]:
+    for start in range(0, len(item_ids), GET_ITEMS_BATCH_SIZE):
+        batch = item_ids[start:start + GET_ITEMS_BATCH_SIZE]
+        yield select(Item).where(Item.id.in_(batch)) if columns is None else select(Item.id, *columns).where(Item.id.in_(batch))
+
+def order_items_by_ids(item_ids: list[int], found: list[Item] | list[Row]) -> list[Item] | list[Row]:
+    by_id = { (item.id if isinstance(item, Item) else item[0]): item for item in found }
+    return [by_id[item_id] for item_id in item_ids if item_id in by_id]
+
+def get_items_by_ids(session: Session, item_ids: list[int], columns: Optional[list[Any]] = None) -> list[Item] | list[Row]:
+    """Fetches Items by id in the order of `item_ids`, with an IN query for each batch of ids
+
+    With `columns`, only those columns are read, and rows of each Item's id
+    followed by them are returned instead of Items, for read-only callers.
+    Ids of Items that don't exist are left out.
+    """
+    found = [] # type: list[Item | Row]
+    for query in items_by_ids_queries(item_ids, columns):
+        found.extend(session.exec(query).all())
+    return order_items_by_ids(item_ids, found)
+
+async def get_items_by_ids_async(session: AsyncSession, item_ids: list[int], columns: Optional[list[Any]] = None) -> list[Item] | list[Row]:
+    found = [] # type: list[Item | Row]
+    for query in items_by_ids_queries(item_ids, columns):
+        found.extend((await session.exec(query)).all())
+    return order_items_by_ids(item_ids, found)
+
+def get_items(item_ref: ItemRef, session: Optional[Session], columns: Optional[list[Any]] = None) -> Generator[Item | Row, None, None]:
+    """Yields the Items an ItemRef leads to in reading order, or rows of their id and `columns`, without a query per Item"""
+    yield from get_items_by_ids(session, list(get_absolute_item_ids(item_ref=item_ref, session=session)), columns)
+
+async def get_items_async(item_ref: ItemRef, session: AsyncSession, columns: Optional[list[Any]] = None) -> list[Item] | list[Row]:
+    return await get_items_by_ids_async(session, await get_absolute_item_ids_async(item_ref, session), columns)
+
+def item_children_page_query(parent_id: int, after: Optional[int], limit: int) -> Select:
+    """A page of an Item's children, with the Items they link to, and whether those have children of their own
+
+    One more row than `limit` is read, telling whether there's a next page.
+    """
+    grandchild = ItemChild.__table__.alias("grandchild")
+    query = (
+        select(
+            ItemChild.id,
+            ItemChild.local_index,
+            ItemChild.label,
+            Item.id,
+            Item.text,
+            Item.children_display_class,
+            exists().where(grandchild.c.parent_id == Item.id),
         )
+        .join(Item, Item.id == ItemChild.child_id)
+        .where(ItemChild.parent_id == parent_id)
+        .order_by(ItemChild.local_index)
+        .limit(limit + 1)
+    )
+    # Seeking past the cursor in the index costs the same on every page, where an offset reads all the rows before it
+    if after is not None:
+        query = query.where(ItemChild.local_index > after)
+    return query
+
+def item_children_page(rows: list[Row], limit: int) -> dict[str, Any]:
+    children = [
+        {
+            "id": item_child_id,
+            "local_index": local_index,
+            "label": label,
+            "child": { "id": item_id, "text": text, "children_display_class": children_display_class.name, "has_children": has_children },
+        }
+        for item_child_id, local_index, label, item_id, text, children_display_class, has_children in rows[:limit]
+    ]
+    return { "children": children, "next": children[-1]["local_index"] if len(rows) > limit else None }
+
+def get_item_children_page(session: Session, parent_id: int, after: Optional[int] = None, limit: int = 50) -> dict[str, Any]:
+    """The children of an Item after the local index `after`, in order, with `next` as the cursor of the following page
+
+    `next` is None on the last page.
+    """
+    return item_children_page(session.exec(item_children_page_query(parent_id, after, limit)).all(), limit)
+
+async def get_item_children_page_async(session: AsyncSession, parent_id: int, after: Optional[int] = None, limit: int = 50) -> dict[str, Any]:
+    return item_children_page((await session.exec(item_children_page_query(parent_id, after, limit))).all(), limit)
+
+def item_subtree_queries(root_id: int) -> tuple[Select, Select]:
+    """Queries of the Items of a subtree, and of the ItemChildren under them in order"""
+    subtree = select(ItemClosure.descendant_id).where(ItemClosure.ancestor_id == root_id)
+    return (
+        select(Item).where(Item.id.in_(subtree)),
+        select(ItemChild).where(ItemChild.parent_id.in_(subtree)).order_by(ItemChild.local_index),
+    )
+
+def link_item_subtree(root_id: int, items: list[Item], item_children: list[ItemChild]) -> Optional[Item]:
+    """Sets the relationships of a loaded subtree as loaded, returning its root"""
+    by_id = { item.id: item for item in items }
+    if root_id not in by_id:
+        return None
+
+    children = { item_id: [] for item_id in by_id } # type: dict[int, list[ItemChild]]
+    for item_child in item_children:
+        set_committed_value(item_child, "parent", by_id[item_child.parent_id])
+        set_committed_value(item_child, "child", by_id[item_child.child_id])
+        children[item_child.parent_id].append(item_child)
+
+    for item_id, linked in children.items():
+        set_committed_value(by_id[item_id], "children", linked)
+    return by_id[root_id]
+
+def load_item_subtree(session: Session, root_id: int) -> Optional[Item]:
+    """Loads an Item with its whole subtree in two queries, through the closure table
+
+    The `children` of each Item in the subtree, and the `parent` and `child`
+    of each of their ItemChildren, are set as loaded, so that walking the tree
+    afterwards reads no more from the database.
+    """
+    items_query, item_children_query = item_subtree_queries(root_id)
+    items = session.exec(items_query).all()
+    return link_item_subtree(root_id, items, session.exec(item_children_query).all())
+
+async def load_item_subtree_async(session: AsyncSession, root_id: int) -> Optional[Item]:
+    items_query, item_children_query = item_subtree_queries(root_id)
+    items = (await session.exec(items_query)).all()
+    return link_item_subtree(root_id, items, (await session.exec(item_children_query)).all())
+
+@dataclass
+class ItemSubtreeVersion:
+    """What a subtree's ETag and Last-Modified are made from
+
+    Each transaction changing Items moves on the `subtree_version` of the
+    changed Items and of all their ancestors (see `mark_stale_subtrees`), so
+    the version of a subtree is read from its root alone.
+    """
+    root_id: int
+    version: int
+    last_modified: datetime
+
+    @property
+    def etag(self) -> str:
+        version = f"{self.root_id}:{self.version}:{self.last_modified.isoformat()}"
+        return '"' + hashlib.sha256(version.encode('utf-8')).hexdigest()[:32] + '"'
+
+def item_subtree_version_query(root_id: int) -> Select:
+    return select(Item.subtree_version, Item.subtree_updated_at).where(Item.id == root_id)
 
-        children = result.scalars().all()
-        next_path = item_ref.path[1:]
+def item_subtree_version(root_id: int, row: Optional[Row]) -> Optional[ItemSubtreeVersion]:
+    if row is None:
+        return None
+    version, last_modified = row
+    return ItemSubtreeVersion(root_id=root_id, version=version, last_modified=last_modified)
 
-        for child in children:
-            for child_id in get_absolute_item_ids(ItemRef(root=child, path=next_path)):
-                yield child_id
-    else:
-        yield item_ref.root
+def get_item_subtree_version(session: Session, root_id: int) -> Optional[ItemSubtreeVersion]:
+    """The version of an Item's subtree, or None if there's no such Item"""
+    return item_subtree_version(root_id, session.exec(item_subtree_version_query(root_id)).first())
 
-def get_items(item_ref: ItemRef, session: Optional[Session]) -> Generator[Item, None, None]:
-    for item_id in get_absolute_item_ids(item_ref=item_ref, session=session):
-        yield session.get(Item, item_id)
+async def get_item_subtree_version_async(session: AsyncSession, root_id: int) -> Optional[ItemSubtreeVersion]:
+    return item_subtree_version(root_id, (await session.exec(item_subtree_version_query(root_id))).first())
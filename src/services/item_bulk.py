@@ -0,0 +1,242 @@
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+import io
+import time
+from typing import Any, Optional
+
+from sqlalchemy import Connection, Table, func, insert, select, text
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import Session
+
+from src.models.item import Item, ItemChild, item_content_hash
+from src.models.item_closure import item_closure_table, link_item_closure
+from src.services.item_closure import item_tree_closure_rows
+
+DEFAULT_BATCH_SIZE = 10000
+
+@dataclass
+class BulkInsertResult:
+    root_id: Optional[int]
+    items: int
+    item_children: int
+    seconds: float
+
+    @property
+    def rows(self) -> int:
+        return self.items + self.item_children
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+    def __str__(self) -> str:
+        return f"{self.items} items and {self.item_children} item children in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)"
+
+def flatten_item_tree(root: Item) -> tuple[list[Item], list[ItemChild]]:
+    """Lists the unsaved Items and ItemChildren of a tree in reading order, parents before their children
+
+    Items that already have an id are saved already, so they are referenced but
+    not descended into. An Item reachable through several ItemChildren is listed once.
+    """
+    items = [] # type: list[Item]
+    item_children = [] # type: list[ItemChild]
+    seen = set() # type: set[int]
+
+    stack = [root] if root.id is None else []
+    seen.add(id(root))
+    while len(stack) > 0:
+        item = stack.pop()
+        items.append(item)
+        item_children.extend(item.children)
+
+        for item_child in reversed(item.children):
+            child = item_child.child
+            if child.id is None and id(child) not in seen:
+                seen.add(id(child))
+                stack.append(child)
+
+    return items, item_children
+
+def reserve_ids(connection: Connection, table: Table, count: int) -> list[int]:
+    """Reserves `count` ids of `table` for rows about to be inserted with them
+
+    On Postgres, ids are drawn from the table's sequence, so concurrent writers
+    can't be handed the same ids. Elsewhere (SQLite), they follow the largest id
+    in use, which assumes a single writer, as imports are. Writes that may run
+    alongside others, such as the API's edits, use `insert_rows_returning_ids`.
+    """
+    if count == 0:
+        return []
+
+    if connection.dialect.name == "postgresql":
+        sequence = connection.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table.name}).scalar_one()
+        return list(connection.execute(
+            select(func.nextval(sequence)).select_from(func.generate_series(1, count))
+        ).scalars())
+
+    largest = connection.execute(select(func.max(table.c.id))).scalar_one()
+    first = (largest or 0) + 1
+    return list(range(first, first + count))
+
+def copy_text_value(value: Any) -> str:
+    """Formats a value for Postgres `COPY ... FROM STDIN` in its text format"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, Enum):
+        value = value.name
+    elif isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, bool):
+        value = "t" if value else "f"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+def can_copy(connection: Connection) -> bool:
+    return connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2"
+
+def insert_rows(connection: Connection, table: Table, rows: list[dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE):
+    """Inserts rows in batches, through `COPY` on Postgres (psycopg2) and executemany elsewhere"""
+    if len(rows) == 0:
+        return
+
+    # Columns left out of the rows (such as ids to generate) are left to the database
+    columns = [column.name for column in table.columns if column.name in rows[0]]
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+
+        if can_copy(connection):
+            buffer = io.StringIO()
+            for row in batch:
+                buffer.write("\t".join(copy_text_value(row[column]) for column in columns))
+                buffer.write("\n")
+            buffer.seek(0)
+
+            quote = connection.dialect.identifier_preparer.quote
+            cursor = connection.connection.driver_connection.cursor()
+            try:
+                cursor.copy_expert(f"COPY {quote(table.name)} ({', '.join(quote(column) for column in columns)}) FROM STDIN", buffer)
+            finally:
+                cursor.close()
+        else:
+            connection.execute(insert(table), batch)
+
+def insert_rows_returning_ids(connection: Connection, table: Table, rows: list[dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> list[int]:
+    """Inserts rows without ids in batches, returning the ids the database gave them in the order of the rows"""
+    ids = [] # type: list[int]
+    for start in range(0, len(rows), batch_size):
+        ids.extend(connection.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            rows[start:start + batch_size],
+        ).scalars())
+    return ids
+
+@dataclass
+class ItemTreeRows:
+    """Column values of a tree of new Items and its ItemChildren, which can be sent between processes
+
+    ItemChildren refer to their parent by its position in `items` (`parent_index`),
+    and to their child likewise (`child_index`) or by its id (`child_id`) if it
+    is saved already. Inserting the rows replaces these with the new ids.
+    """
+    items: list[dict[str, Any]]
+    item_children: list[dict[str, Any]]
+
+def item_tree_rows(root: Item) -> ItemTreeRows:
+    return flattened_item_rows(flatten_item_tree(root)[0])
+
+def set_content_hashes(items: list[Item]):
+    """Sets the content hash of the Items listed by `flatten_item_tree`, children before their parents"""
+    for item in reversed(items):
+        item.content_hash = item_content_hash(item.text, item.children_display_class, (
+            (item_child.label, item_child.child.content_hash) for item_child in item.children
+        ))
+
+def flattened_item_rows(items: list[Item]) -> ItemTreeRows:
+    """Rows of the Items listed by `flatten_item_tree`, with their content hashes"""
+    item_table = Item.__table__ # type: Table
+    item_child_table = ItemChild.__table__ # type: Table
+    positions = { id(item): index for index, item in enumerate(items) } # type: dict[int, int]
+
+    set_content_hashes(items)
+
+    item_rows = [{ column.name: getattr(item, column.name) for column in item_table.columns } for item in items]
+
+    # Same order as the ItemChildren of `flatten_item_tree`
+    item_child_rows = [] # type: list[dict[str, Any]]
+    for index, item in enumerate(items):
+        for item_child in item.children:
+            row = { column.name: getattr(item_child, column.name) for column in item_child_table.columns }
+            row["parent_index"] = index
+            row["child_index"] = positions.get(id(item_child.child))
+            if row["child_index"] is None:
+                row["child_id"] = item_child.child.id
+            item_child_rows.append(row)
+
+    return ItemTreeRows(items=item_rows, item_children=item_child_rows)
+
+def insert_item_tree_rows(session: Session, rows: ItemTreeRows, batch_size: int = DEFAULT_BATCH_SIZE, commit: bool = True) -> BulkInsertResult:
+    """Saves the rows of a tree in one transaction, setting their new ids, and commits the session unless told not to
+
+    The closure rows of the new Items are written along with them.
+    """
+    start = time.perf_counter()
+
+    item_table = Item.__table__ # type: Table
+    item_child_table = ItemChild.__table__ # type: Table
+
+    connection = session.connection()
+    item_ids = reserve_ids(connection, item_table, len(rows.items))
+    item_child_ids = reserve_ids(connection, item_child_table, len(rows.item_children))
+
+    for row, item_id in zip(rows.items, item_ids):
+        row["id"] = item_id
+
+    saved_children = [] # type: list[dict[str, Any]]
+    for row, item_child_id in zip(rows.item_children, item_child_ids):
+        row["id"] = item_child_id
+        row["parent_id"] = item_ids[row.pop("parent_index")]
+        child_index = row.pop("child_index")
+        if child_index is not None:
+            row["child_id"] = item_ids[child_index]
+        else:
+            saved_children.append(row)
+
+    insert_rows(connection, item_table, rows.items, batch_size)
+    insert_rows(connection, item_child_table, rows.item_children, batch_size)
+    insert_rows(connection, item_closure_table(), item_tree_closure_rows(item_ids, rows.item_children), batch_size)
+    for row in saved_children:
+        link_item_closure(connection, row["id"], row["parent_id"], row["child_id"], row["local_index"])
+    if commit:
+        session.commit()
+
+    return BulkInsertResult(
+        root_id=item_ids[0] if len(item_ids) > 0 else None,
+        items=len(rows.items),
+        item_children=len(rows.item_children),
+        seconds=time.perf_counter() - start,
+    )
+
+def bulk_insert_item_tree(session: Session, root: Item, batch_size: int = DEFAULT_BATCH_SIZE) -> BulkInsertResult:
+    """Saves a tree of new Items and ItemChildren in one transaction, without the ORM's per-row overhead
+
+    Ids are reserved up front, so rows are written in large batches and the
+    ORM never flushes the tree. Afterwards the objects carry their new ids
+    (but stay outside the session), and the session is committed.
+    """
+    start = time.perf_counter()
+
+    items, item_children = flatten_item_tree(root)
+    rows = flattened_item_rows(items)
+    result = insert_item_tree_rows(session, rows, batch_size)
+
+    # Set the ids without marking the objects as modified
+    for item, row in zip(items, rows.items):
+        set_committed_value(item, "id", row["id"])
+    for item_child, row in zip(item_children, rows.item_children):
+        for column in ["id", "parent_id", "child_id"]:
+            set_committed_value(item_child, column, row[column])
+
+    result.root_id = root.id
+    result.seconds = time.perf_counter() - start
+    return result
@@ -0,0 +1,206 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+import json
+import threading
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import event, update
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.config import settings
+from src.models.item import CHANGED_ITEM_IDS, Item
+from src.models.item_closure import ItemClosure
+from src.services.item import ItemSubtreeVersion, get_item_subtree_version, get_item_subtree_version_async, load_item_subtree, load_item_subtree_async
+
+# `Session.info` key of the Items whose cached subtrees go out of date when the session commits
+STALE_ITEM_IDS = "stale_item_ids"
+
+def serialize_item_subtree(item: Item) -> dict[str, Any]:
+    """An Item and its loaded subtree in the shape of ItemRead"""
+    return {
+        "id": item.id,
+        "text": item.text,
+        "children_display_class": item.children_display_class.name,
+        "children": [
+            { "id": item_child.id, "local_index": item_child.local_index, "label": item_child.label, "child": serialize_item_subtree(item_child.child) }
+            for item_child in item.children
+        ],
+    }
+
+class SubtreeCacheBackend(ABC):
+    """Where serialized subtrees are kept with their versions, by the id of their root Item
+
+    Backends shared between processes (such as one on Redis) let several API
+    workers use the same cached subtrees, and see each other's invalidations.
+    """
+    @abstractmethod
+    def get(self, item_id: int) -> Optional[tuple[str, bytes]]:
+        pass
+
+    @abstractmethod
+    def set(self, item_id: int, version: str, value: bytes):
+        pass
+
+    @abstractmethod
+    def delete(self, item_ids: Iterable[int]):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+class LRUSubtreeCacheBackend(SubtreeCacheBackend):
+    """Keeps subtrees in this process, evicting the least recently used once they take more than `max_bytes`"""
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self.entries = OrderedDict() # type: OrderedDict[int, tuple[str, bytes]]
+        self.lock = threading.Lock()
+
+    def get(self, item_id: int) -> Optional[tuple[str, bytes]]:
+        with self.lock:
+            entry = self.entries.get(item_id)
+            if entry is not None:
+                self.entries.move_to_end(item_id)
+            return entry
+
+    def set(self, item_id: int, version: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(item_id, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+            self.entries[item_id] = (version, value)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def delete(self, item_ids: Iterable[int]):
+        with self.lock:
+            for item_id in item_ids:
+                entry = self.entries.pop(item_id, None)
+                if entry is not None:
+                    self.size -= len(entry[1])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+class ItemSubtreeCache:
+    """A read-through cache of Item subtrees serialized as JSON
+
+    Subtrees are cached with the version they were read at, and only served
+    for that version, so looking one up costs no more than reading the
+    version of the subtree. Committing changes to Items also invalidates the
+    subtrees of the changed Items and of all their ancestors, to free them.
+    """
+    def __init__(self, backend: SubtreeCacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session: Session, item_id: int, version: Optional[ItemSubtreeVersion] = None) -> Optional[bytes]:
+        """The subtree of an Item as JSON, read from the database unless it's cached at its version, or None if there's no such Item
+
+        The version is read when the caller hasn't already.
+        """
+        if version is None:
+            version = get_item_subtree_version(session, item_id)
+            if version is None:
+                return None
+        value = self.lookup(item_id, version)
+        if value is not None:
+            return value
+
+        self.misses += 1
+        return self.store(item_id, version, load_item_subtree(session, item_id))
+
+    async def get_async(self, session: AsyncSession, item_id: int, version: Optional[ItemSubtreeVersion] = None) -> Optional[bytes]:
+        if version is None:
+            version = await get_item_subtree_version_async(session, item_id)
+            if version is None:
+                return None
+        value = self.lookup(item_id, version)
+        if value is not None:
+            return value
+
+        self.misses += 1
+        return self.store(item_id, version, await load_item_subtree_async(session, item_id))
+
+    def lookup(self, item_id: int, version: ItemSubtreeVersion) -> Optional[bytes]:
+        entry = self.backend.get(item_id)
+        if entry is None or entry[0] != version.etag:
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def store(self, item_id: int, version: ItemSubtreeVersion, item: Optional[Item]) -> Optional[bytes]:
+        if item is None:
+            return None
+        value = json.dumps(serialize_item_subtree(item)).encode('utf-8')
+        self.backend.set(item_id, version.etag, value)
+        return value
+
+    def invalidate(self, item_ids: Iterable[int]):
+        self.backend.delete(item_ids)
+
+    def stats(self) -> dict[str, int]:
+        return { "hits": self.hits, "misses": self.misses }
+
+item_subtree_cache = ItemSubtreeCache(LRUSubtreeCacheBackend(settings.ITEM_SUBTREE_CACHE_BYTES))
+
+def use_subtree_cache_backend(backend: SubtreeCacheBackend):
+    """Replaces where subtrees are cached, such as with a backend shared between workers"""
+    item_subtree_cache.backend = backend
+
+def mark_stale_subtrees(session: Session, item_ids: Iterable[int]) -> set[int]:
+    """Adds Items and their ancestors to those whose cached subtrees are invalidated when the session commits
+
+    Moves on the `subtree_version` of each of them the first time it's marked
+    in the transaction. Returns the Items added, for changes made around the
+    ORM that have other state of these Items to update.
+    """
+    item_ids = set(item_ids)
+    if len(item_ids) == 0:
+        return set()
+    connection = session.connection()
+    stale = set(item_ids)
+    stale.update(connection.execute(
+        select(ItemClosure.ancestor_id).where(ItemClosure.descendant_id.in_(item_ids)).distinct()
+    ).scalars())
+    marked = session.info.setdefault(STALE_ITEM_IDS, set())
+    unmarked = stale - marked
+    if unmarked:
+        item = Item.__table__
+        connection.execute(
+            update(item)
+            .where(item.c.id.in_(unmarked))
+            .values(subtree_version=item.c.subtree_version + 1, subtree_updated_at=datetime.utcnow())
+        )
+    marked.update(stale)
+    return stale
+
+@event.listens_for(Session, "after_flush")
+def find_stale_subtrees(session: Session, flush_context):
+    """Adds the ancestors of the Items changed in a flush, while the closure table still has them, to those to invalidate"""
+    changed = session.info.pop(CHANGED_ITEM_IDS, None)
+    if changed:
+        mark_stale_subtrees(session, changed)
+
+@event.listens_for(Session, "after_commit")
+def invalidate_stale_subtrees(session: Session):
+    stale = session.info.pop(STALE_ITEM_IDS, None)
+    if stale:
+        item_subtree_cache.invalidate(stale)
+
+@event.listens_for(Session, "after_rollback")
+def forget_stale_subtrees(session: Session):
+    session.info.pop(STALE_ITEM_IDS, None)
+    session.info.pop(CHANGED_ITEM_IDS, None)
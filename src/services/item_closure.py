@@ -0,0 +1,90 @@
+from typing import Any, Optional
+
+from sqlalchemy import Integer, Select, Text, cast, delete, func, insert, literal
+from sqlmodel import Session, select
+
+from src.db.functions import padded_index
+from src.models.item import Item, ItemChild
+from src.models.item_closure import ItemClosure, closure_sort_key, item_closure_table
+
+def item_tree_closure_rows(item_ids: list[int], item_children: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Closure rows of new Items, given the rows of the ItemChildren under them (with ids set)
+
+    Paths are followed through new Items only. Links to saved Items are left
+    to `link_item_closure`, once the new rows are in.
+    """
+    new = set(item_ids)
+    children = {} # type: dict[int, list[tuple[int, int, int]]]
+    for row in item_children:
+        if row["child_id"] in new:
+            children.setdefault(row["parent_id"], []).append((row["id"], row["child_id"], row["local_index"]))
+
+    rows = [] # type: list[dict[str, Any]]
+    for ancestor_id in item_ids:
+        stack = [(ancestor_id, 0, "", None)] # type: list[tuple[int, int, str, Optional[int]]]
+        while len(stack) > 0:
+            descendant_id, depth, sort_key, item_child_id = stack.pop()
+            rows.append({ "ancestor_id": ancestor_id, "descendant_id": descendant_id, "depth": depth, "sort_key": sort_key, "item_child_id": item_child_id })
+            for item_child_id, child_id, local_index in children.get(descendant_id, []):
+                stack.append((child_id, depth + 1, sort_key + closure_sort_key(local_index), item_child_id))
+    return rows
+
+def rebuild_item_closure(session: Session) -> int:
+    """Replaces the whole closure table with one built from ItemChild, returning how many rows it has
+
+    This fills it in for Items saved before it was kept, and repairs it after
+    changes made around the ORM.
+    """
+    closure = item_closure_table()
+    link = ItemChild.__table__.alias("link")
+
+    paths = select(
+        Item.id.label("ancestor_id"),
+        Item.id.label("descendant_id"),
+        literal(0, Integer).label("depth"),
+        cast(literal(""), Text).label("sort_key"),
+        cast(literal(None), Integer).label("item_child_id"),
+    ).cte("paths", recursive=True)
+    paths = paths.union_all(
+        select(
+            paths.c.ancestor_id,
+            link.c.child_id,
+            paths.c.depth + 1,
+            paths.c.sort_key + padded_index(link.c.local_index),
+            link.c.id,
+        ).join(link, link.c.parent_id == paths.c.descendant_id)
+    )
+
+    connection = session.connection()
+    connection.execute(delete(closure))
+    connection.execute(insert(closure).from_select(
+        ["ancestor_id", "descendant_id", "depth", "sort_key", "item_child_id"],
+        select(paths.c.ancestor_id, paths.c.descendant_id, paths.c.depth, paths.c.sort_key, paths.c.item_child_id),
+    ))
+    session.commit()
+    return session.exec(select(func.count()).select_from(closure)).one()
+
+def in_subtree(query: Select, root_id: int, max_depth: Optional[int] = None) -> Select:
+    """Limits a query on ItemClosure to an Item's subtree, down to `max_depth` levels below it, in document order"""
+    query = query.where(ItemClosure.ancestor_id == root_id)
+    if max_depth is not None:
+        query = query.where(ItemClosure.depth <= max_depth)
+    return query.order_by(ItemClosure.sort_key)
+
+def get_subtree_item_ids(session: Session, root_id: int, max_depth: Optional[int] = None) -> list[int]:
+    """Ids of an Item and its descendants in document order, from one query on the closure index"""
+    return list(session.exec(in_subtree(select(ItemClosure.descendant_id), root_id, max_depth)).all())
+
+def get_subtree_items(session: Session, root_id: int, max_depth: Optional[int] = None) -> list[tuple[int, Item]]:
+    """An Item and its descendants in document order, each with its depth below the Item, from one query"""
+    return list(session.exec(in_subtree(
+        select(ItemClosure.depth, Item).join(Item, Item.id == ItemClosure.descendant_id), root_id, max_depth,
+    )).all())
+
+def get_ancestor_ids(session: Session, item_id: int) -> list[int]:
+    """Ids of the Items an Item is under, nearest first, along every path to it"""
+    return list(session.exec(
+        select(ItemClosure.ancestor_id)
+        .where(ItemClosure.descendant_id == item_id, ItemClosure.depth > 0)
+        .order_by(ItemClosure.depth)
+    ).all())
@@ -0,0 +1,283 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import Connection, RowMapping, Table, bindparam, delete, update
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.item import (
+    Item,
+    ItemBulkEdit,
+    ItemChild,
+    ItemChildCreate,
+    ItemChildReference,
+    ItemChildrenDisplayClass,
+    ItemCreate,
+    ItemReference,
+    ItemUpdate,
+)
+from src.models.item_closure import ItemClosure, item_closure_table, link_item_closure, unlink_item_closure
+from src.services.item_bulk import DEFAULT_BATCH_SIZE, insert_rows, insert_rows_returning_ids
+from src.services.item_cache import mark_stale_subtrees
+from src.services.item_closure import item_tree_closure_rows
+from src.services.verse_alignment import reindex_book_verses
+
+# Columns of an ItemChild whose change moves the paths through it
+PATH_COLUMNS = { "parent_id", "parent_index", "child_id", "child_index", "local_index" }
+
+@dataclass
+class ItemEditResult:
+    """The ids given to the new Items and ItemChildren of an edit, each in the order they appear in its payload"""
+    items: list[int]
+    item_children: list[int]
+
+class ItemEditPlan:
+    """The rows and changes of an `ItemBulkEdit`, flattened from its nested payload
+
+    As with `ItemTreeRows`, new Items are referred to by their position in
+    `items` (`parent_index`, `child_index`) until they have ids.
+    """
+    def __init__(self, connection: Connection, links: dict[int, RowMapping]):
+        self.connection = connection
+        # The saved ItemChildren the edit refers to, by id
+        self.links = links
+        self.now = datetime.utcnow()
+
+        self.items = [] # type: list[dict[str, Any]]
+        self.item_children = [] # type: list[dict[str, Any]]
+        self.item_updates = [] # type: list[dict[str, Any]]
+        self.item_child_updates = [] # type: list[tuple[RowMapping, dict[str, Any]]]
+        self.removed = [] # type: list[RowMapping]
+
+        # Saved Items whose subtrees change
+        self.changed = set() # type: set[int]
+        # Saved Items the edit refers to, which have to exist
+        self.referenced = set() # type: set[int]
+        self.claimed = set() # type: set[int]
+        self.next_local_indexes = {} # type: dict[int, int]
+
+    def create(self, item: ItemCreate) -> int:
+        index = len(self.items)
+        self.items.append({
+            "created_at": self.now,
+            "updated_at": self.now,
+            "subtree_updated_at": self.now,
+            "text": item.text,
+            "children_display_class": item.children_display_class or ItemChildrenDisplayClass.BLOCK,
+            "content_hash": None,
+        })
+        for local_index, item_child in enumerate(item.children):
+            if isinstance(item_child, ItemChildReference):
+                link = self.claim(item_child.id)
+                self.item_child_updates.append((link, { "parent_index": index, "local_index": local_index }))
+                if link["parent_id"] is not None:
+                    self.changed.add(link["parent_id"])
+            else:
+                self.link(item_child, { "parent_index": index }, local_index)
+        return index
+
+    def link(self, item_child: ItemChildCreate, parent: dict[str, int], local_index: int):
+        row = { "added_at": self.now, "updated_at": self.now, "local_index": local_index, "label": item_child.label, **parent }
+        self.item_children.append(row)
+        if isinstance(item_child.child, ItemReference):
+            row["child_id"] = item_child.child.id
+            self.referenced.add(item_child.child.id)
+        else:
+            row["child_index"] = self.create(item_child.child)
+
+    def update(self, item_id: int, item: ItemUpdate):
+        self.referenced.add(item_id)
+        changes = {} # type: dict[str, Any]
+        if "text" in item.model_fields_set:
+            changes["text"] = item.text
+        if item.child_display_class is not None:
+            changes["children_display_class"] = item.child_display_class
+        if len(changes) > 0:
+            self.item_updates.append({ "id": item_id, **changes })
+            self.changed.add(item_id)
+
+        for item_child in item.children_create or []:
+            self.link(item_child, { "parent_id": item_id }, self.next_local_index(item_id))
+            self.changed.add(item_id)
+
+        for item_child_update in item.children_update or []:
+            link = self.claim(item_child_update.id, item_id)
+            changes = {}
+            if item_child_update.local_index is not None:
+                changes["local_index"] = item_child_update.local_index
+            if "label" in item_child_update.model_fields_set:
+                changes["label"] = item_child_update.label
+            if isinstance(item_child_update.child, ItemCreate):
+                changes["child_index"] = self.create(item_child_update.child)
+            elif isinstance(item_child_update.child, ItemUpdate):
+                self.update(link["child_id"], item_child_update.child)
+            if len(changes) > 0:
+                self.item_child_updates.append((link, changes))
+                self.changed.add(item_id)
+
+        for item_child_remove in item.children_remove or []:
+            self.removed.append(self.claim(item_child_remove.id, item_id))
+            self.changed.add(item_id)
+
+    def claim(self, item_child_id: int, parent_id: Optional[int] = None) -> RowMapping:
+        """The saved ItemChild an edit changes, which has to be a child of `parent_id` if given, and changed once"""
+        link = self.links.get(item_child_id)
+        if link is None or (parent_id is not None and link["parent_id"] != parent_id):
+            raise ValueError(f"ItemChild {item_child_id} is not a child of Item {parent_id}" if parent_id is not None else f"ItemChild {item_child_id} not found")
+        if item_child_id in self.claimed:
+            raise ValueError(f"ItemChild {item_child_id} is changed more than once")
+        self.claimed.add(item_child_id)
+        return link
+
+    def next_local_index(self, parent_id: int) -> int:
+        if parent_id not in self.next_local_indexes:
+            last = self.connection.execute(
+                select(ItemChild.local_index).where(ItemChild.parent_id == parent_id).order_by(ItemChild.local_index.desc()).limit(1)
+            ).scalar_one_or_none()
+            self.next_local_indexes[parent_id] = last + 1 if last is not None else 0
+        self.next_local_indexes[parent_id] += 1
+        return self.next_local_indexes[parent_id] - 1
+
+def edit_item_child_ids(edit: ItemBulkEdit) -> set[int]:
+    """The ids of the saved ItemChildren an edit refers to, anywhere in its payload"""
+    item_child_ids = set() # type: set[int]
+
+    def visit_create(item: ItemCreate):
+        for item_child in item.children:
+            if isinstance(item_child, ItemChildReference):
+                item_child_ids.add(item_child.id)
+            elif isinstance(item_child.child, ItemCreate):
+                visit_create(item_child.child)
+
+    def visit_update(item: ItemUpdate):
+        for item_child in item.children_create or []:
+            if isinstance(item_child.child, ItemCreate):
+                visit_create(item_child.child)
+        for item_child_update in item.children_update or []:
+            item_child_ids.add(item_child_update.id)
+            if isinstance(item_child_update.child, ItemCreate):
+                visit_create(item_child_update.child)
+            elif isinstance(item_child_update.child, ItemUpdate):
+                visit_update(item_child_update.child)
+        item_child_ids.update(item_child_remove.id for item_child_remove in item.children_remove or [])
+
+    for item in edit.create:
+        visit_create(item)
+    for item in edit.update.values():
+        visit_update(item)
+    return item_child_ids
+
+def plan_item_edit(connection: Connection, edit: ItemBulkEdit) -> ItemEditPlan:
+    item_child_ids = edit_item_child_ids(edit)
+    links = {} # type: dict[int, RowMapping]
+    if len(item_child_ids) > 0:
+        links = { row["id"]: row for row in connection.execute(select(ItemChild.__table__).where(ItemChild.id.in_(item_child_ids))).mappings() }
+
+    plan = ItemEditPlan(connection, links)
+    for item in edit.create:
+        plan.create(item)
+    for item_id, item in edit.update.items():
+        plan.update(item_id, item)
+
+    if len(plan.referenced) > 0:
+        found = set(connection.execute(select(Item.id).where(Item.id.in_(plan.referenced))).scalars())
+        missing = sorted(plan.referenced - found)
+        if len(missing) > 0:
+            raise ValueError(f"Items not found: {', '.join(str(item_id) for item_id in missing)}")
+    return plan
+
+def update_rows(connection: Connection, table: Table, rows: list[dict[str, Any]]):
+    """Updates rows by id with an executemany for each set of columns changed"""
+    by_columns = {} # type: dict[tuple[str, ...], list[dict[str, Any]]]
+    for row in rows:
+        columns = tuple(sorted(column for column in row if column != "id"))
+        by_columns.setdefault(columns, []).append({ f"new_{column}": value for column, value in row.items() })
+    for columns, batch in by_columns.items():
+        connection.execute(
+            update(table).where(table.c.id == bindparam("new_id")).values({ column: bindparam(f"new_{column}") for column in columns }),
+            batch,
+        )
+
+def link_without_cycle(connection: Connection, item_child_id: int, parent_id: int, child_id: int, local_index: int):
+    within = connection.execute(
+        select(ItemClosure.id).where(ItemClosure.ancestor_id == child_id, ItemClosure.descendant_id == parent_id).limit(1)
+    ).first()
+    if within is not None:
+        raise ValueError(f"Item {child_id} can't be a child of Item {parent_id}, which is within it")
+    link_item_closure(connection, item_child_id, parent_id, child_id, local_index)
+
+def apply_item_edit_plan(session: Session, plan: ItemEditPlan, batch_size: int) -> ItemEditResult:
+    connection = session.connection()
+    item_table = Item.__table__ # type: Table
+    item_child_table = ItemChild.__table__ # type: Table
+
+    # The ancestors the changed Items have before the edit, while the closure table has them
+    stale = mark_stale_subtrees(session, plan.changed)
+
+    moved = [(link, changes) for link, changes in plan.item_child_updates if len(PATH_COLUMNS & changes.keys()) > 0]
+    for link in plan.removed + [link for link, _ in moved]:
+        if link["parent_id"] is not None:
+            unlink_item_closure(connection, link["parent_id"], link["child_id"], link["local_index"])
+    if len(plan.removed) > 0:
+        connection.execute(delete(item_child_table).where(item_child_table.c.id.in_([link["id"] for link in plan.removed])))
+
+    # Other edits may be inserting at the same time, so the database gives the ids
+    item_ids = insert_rows_returning_ids(connection, item_table, plan.items, batch_size)
+    for row in plan.item_children + [changes for _, changes in plan.item_child_updates]:
+        for key in ["parent", "child"]:
+            if f"{key}_index" in row:
+                row[f"{key}_id"] = item_ids[row.pop(f"{key}_index")]
+    item_child_ids = insert_rows_returning_ids(connection, item_child_table, plan.item_children, batch_size)
+    for row, item_child_id in zip(plan.item_children, item_child_ids):
+        row["id"] = item_child_id
+
+    insert_rows(connection, item_closure_table(), item_tree_closure_rows(item_ids, plan.item_children), batch_size)
+
+    update_rows(connection, item_table, [{ **row, "updated_at": plan.now } for row in plan.item_updates])
+    update_rows(connection, item_child_table, [{ "id": link["id"], **changes, "updated_at": plan.now } for link, changes in plan.item_child_updates])
+
+    # Paths through links between saved Items and new ones, and through moved links
+    new = set(item_ids)
+    for row in plan.item_children:
+        if row["parent_id"] not in new or row["child_id"] not in new:
+            link_without_cycle(connection, row["id"], row["parent_id"], row["child_id"], row["local_index"])
+    for link, changes in moved:
+        link_without_cycle(connection, link["id"], changes.get("parent_id", link["parent_id"]), changes.get("child_id", link["child_id"]), changes.get("local_index", link["local_index"]))
+
+    # And those they have after it. Content hashes are only kept for imports, which recompute the ones cleared here
+    stale |= mark_stale_subtrees(session, plan.changed)
+    if len(stale) > 0:
+        connection.execute(update(item_table).where(item_table.c.id.in_(stale)).values(content_hash=None))
+
+    # Links removed, moved or relabeled may be verses', whose references and alignments follow the tree
+    if len(plan.removed) > 0 or len(plan.item_child_updates) > 0 or len(plan.item_children) > 0:
+        reindex_book_verses(session, stale)
+
+    return ItemEditResult(items=item_ids, item_children=item_child_ids)
+
+def apply_item_edit(session: Session, edit: ItemBulkEdit, batch_size: int = DEFAULT_BATCH_SIZE, commit: bool = True) -> ItemEditResult:
+    """Applies the creations, updates and removals of a nested edit in one transaction
+
+    The payload is flattened first, then written with a few batched
+    statements whatever its size, besides those keeping the closure table
+    up to date for each link between saved Items and new ones, and those
+    indexing again the verses of imported books whose links change. Raises a
+    ValueError, having changed nothing, if the edit refers to Items or
+    ItemChildren that don't exist or don't belong where it puts them, or if
+    it would put an Item within itself.
+    """
+    try:
+        plan = plan_item_edit(session.connection(), edit)
+        result = apply_item_edit_plan(session, plan, batch_size)
+    except Exception:
+        session.rollback()
+        raise
+    if commit:
+        session.commit()
+    return result
+
+async def apply_item_edit_async(session: AsyncSession, edit: ItemBulkEdit, batch_size: int = DEFAULT_BATCH_SIZE) -> ItemEditResult:
+    result = await session.run_sync(apply_item_edit, edit, batch_size, False)
+    await session.commit()
+    return result
@@ -0,0 +1,217 @@
+from dataclasses import dataclass
+import hashlib
+from typing import Optional
+
+from sqlmodel import Session, select
+
+from src.models.item import Item, ItemChild, item_content_hash
+from src.models.item_import import ItemImportSource
+from src.services.item_bulk import flatten_item_tree, set_content_hashes
+
+def source_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+@dataclass
+class ItemSyncResult:
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.inserted} inserted, {self.updated} updated, {self.deleted} deleted"
+
+def match_children(stored: list[ItemChild], new: list[ItemChild]) -> list[Optional[ItemChild]]:
+    """Pairs each new ItemChild with a stored one (or None) to update in its place
+
+    Children with unchanged content are paired first, then children with the
+    same label, then the remaining unlabeled children in order, so that the
+    Items that stay keep their ids.
+    """
+    matches = [None] * len(new) # type: list[Optional[ItemChild]]
+    unmatched = list(stored)
+
+    def pair(key):
+        candidates = {} # type: dict[object, list[ItemChild]]
+        for item_child in unmatched:
+            candidates.setdefault(key(item_child), []).append(item_child)
+
+        for index, item_child in enumerate(new):
+            if matches[index] is not None:
+                continue
+            found = candidates.get(key(item_child))
+            if found:
+                match = found.pop(0)
+                matches[index] = match
+                unmatched.remove(match)
+
+    pair(lambda item_child: (item_child.label, item_child.child.content_hash or object()))
+    pair(lambda item_child: item_child.label if item_child.label is not None else object())
+    pair(lambda item_child: True if item_child.label is None else object())
+
+    return matches
+
+def linked_rows(item: Item) -> int:
+    """Counts the rows of a new ItemChild linking to `item`, and of `item`'s subtree"""
+    items, item_children = flatten_item_tree(item)
+    return 1 + len(items) + len(item_children)
+
+def delete_item_child(session: Session, item_child: ItemChild, result: ItemSyncResult, detach: bool = True):
+    """Deletes a link to an Item, and the Item's subtree if nothing else links to it
+
+    With `detach`, the link is also removed from its parent's loaded children,
+    which is only needed when the parent stays.
+    """
+    child = item_child.child
+    if detach and item_child.parent is not None:
+        item_child.parent.children.remove(item_child)
+    session.delete(item_child)
+    result.deleted += 1
+
+    if len(child.containing_item_child) <= 1:
+        for grandchild in child.children:
+            delete_item_child(session, grandchild, result, detach=False)
+        session.delete(child)
+        result.deleted += 1
+
+def sync_item(session: Session, stored: Item, new: Item, result: ItemSyncResult):
+    """Updates a stored Item's subtree to match a new, unsaved one whose content hashes are set
+
+    Subtrees whose content hash is unchanged are left alone unread. Only the
+    imported children of stored Items are matched, changed or deleted; others,
+    such as those added through the API, are kept after the imported child
+    they followed.
+    """
+    if stored.content_hash is not None and stored.content_hash == new.content_hash:
+        return
+
+    if stored.text != new.text or stored.children_display_class != new.children_display_class:
+        stored.text = new.text
+        stored.children_display_class = new.children_display_class
+        result.updated += 1
+
+    stored_children = sorted(stored.children, key=lambda item_child: item_child.local_index)
+    new_children = list(new.children)
+    matches = match_children([item_child for item_child in stored_children if item_child.imported], new_children)
+
+    matched = set(id(match) for match in matches if match is not None)
+    # Children that weren't imported, by the imported child left before them (or None)
+    kept_after = {} # type: dict[Optional[int], list[ItemChild]]
+    previous = None # type: Optional[ItemChild]
+    for item_child in stored_children:
+        if not item_child.imported:
+            kept_after.setdefault(id(previous) if previous is not None else None, []).append(item_child)
+        elif id(item_child) in matched:
+            previous = item_child
+        else:
+            delete_item_child(session, item_child, result)
+
+    local_index = 0
+
+    def place_kept(after: Optional[ItemChild]):
+        nonlocal local_index
+        for item_child in kept_after.get(id(after) if after is not None else None, []):
+            if item_child.local_index != local_index:
+                item_child.local_index = local_index
+                result.updated += 1
+            local_index += 1
+
+    place_kept(None)
+    for new_child, match in zip(new_children, matches):
+        if match is None:
+            # The new subtree is saved along with the ItemChild
+            new.children.remove(new_child)
+            new_child.local_index = local_index
+            stored.children.append(new_child)
+            result.inserted += linked_rows(new_child.child)
+            local_index += 1
+            continue
+
+        if match.local_index != local_index or match.label != new_child.label:
+            match.local_index = local_index
+            match.label = new_child.label
+            result.updated += 1
+        local_index += 1
+        sync_item(session, match.child, new_child.child, result)
+        place_kept(match)
+
+    stored.content_hash = new.content_hash
+
+def update_content_hash(item: Item):
+    """Recomputes an Item's content hash from its children's stored hashes"""
+    item.content_hash = item_content_hash(item.text, item.children_display_class, (
+        (item_child.label, item_child.child.content_hash)
+        for item_child in sorted(item.children, key=lambda item_child: item_child.local_index)
+    ))
+
+def sync_books(session: Session, root: Item, translation: str, sources: list[tuple[str, str]], books: dict[str, Item]) -> ItemSyncResult:
+    """Updates the books of an imported Bible to match its source files, without committing
+
+    `sources` lists the (filename, source hash) of each file in order, and
+    `books` maps the files that changed since the last import to their newly
+    built book Items (if they have any). Books of unchanged files are kept
+    as they are, and books of files no longer listed are deleted.
+    """
+    result = ItemSyncResult()
+
+    # Flush once everything has changed, rather than before each lazy load
+    with session.no_autoflush:
+        stored_sources = { source.filename: source for source in session.exec(
+            select(ItemImportSource).where(ItemImportSource.root_id == root.id)
+        ).all() }
+        links = { item_child.child_id: item_child for item_child in root.children }
+        filenames = set(filename for filename, _ in sources)
+
+        for filename, source in list(stored_sources.items()):
+            if filename not in filenames:
+                if source.item_id is not None and source.item_id in links:
+                    delete_item_child(session, links.pop(source.item_id), result)
+                session.delete(source)
+                del stored_sources[filename]
+
+        changed = [] # type: list[tuple[ItemImportSource, Optional[ItemChild]]]
+        local_index = 0
+        for filename, hash in sources:
+            source = stored_sources.get(filename)
+            link = links.get(source.item_id) if source is not None and source.item_id is not None else None
+
+            if source is None or source.source_hash != hash:
+                book = books.get(filename)
+
+                if book is None:
+                    if link is not None:
+                        delete_item_child(session, link, result)
+                        link = None
+                else:
+                    set_content_hashes(flatten_item_tree(book)[0])
+                    # Detach the book from the Bible it was built in, which is not to be saved
+                    book.containing_item_child.clear()
+                    if link is None:
+                        link = ItemChild(local_index=local_index, label=book.text, child=book, imported=True)
+                        root.children.append(link)
+                        result.inserted += linked_rows(book)
+                    else:
+                        if link.label != book.text:
+                            link.label = book.text
+                            result.updated += 1
+                        sync_item(session, link.child, book, result)
+
+                if source is None:
+                    source = ItemImportSource(translation=translation, root_id=root.id, filename=filename, source_hash=hash)
+                    session.add(source)
+                source.source_hash = hash
+                changed.append((source, link))
+
+            if link is not None:
+                if link.local_index != local_index:
+                    link.local_index = local_index
+                    result.updated += 1
+                local_index += 1
+
+        # New books get their ids here
+        session.flush()
+        for source, link in changed:
+            source.item_id = link.child.id if link is not None else None
+
+        update_content_hash(root)
+
+    return result
@@ -0,0 +1,111 @@
+from dataclasses import dataclass
+import re
+from typing import Any, Optional
+
+from sqlalchemy import Select, TextClause, and_, text
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.Bible.index_settings import indexSettings
+from src.Bible.usfm import DESCRIPTIVE_TITLE_LABEL
+from src.models.item import Item
+from src.models.item_closure import ItemClosure
+from src.models.item_search import ITEM_FTS_TABLE, TEXT_SEARCH_CONFIGURATION, item_text_search_vector
+from src.models.verse_reference import SUPERSCRIPT_VERSE, VerseReference
+from src.publications.publication_items import PublicationChapterSubchapterRange, PublicationItemsIndex
+from src.services.verse_reference import VERSE_BOOK_DEPTH
+
+_TERM = re.compile(r'\w+')
+
+@dataclass
+class ItemSearchHit:
+    id: int
+    text: Optional[str]
+    # Higher is more relevant
+    rank: float
+    # For verses, where they are, e.g. "Genesis 1:3"
+    translation: Optional[str] = None
+    reference: Optional[str] = None
+
+def fts5_query(query: str) -> str:
+    """Matches all the words of a query, each quoted so that nothing in it is taken as FTS5 syntax"""
+    return " ".join(f'"{term}"' for term in _TERM.findall(query))
+
+def verse_label(verse: int) -> str:
+    return DESCRIPTIVE_TITLE_LABEL if verse == SUPERSCRIPT_VERSE else str(verse)
+
+def verse_references_query(hits: list[ItemSearchHit]) -> Select:
+    book = aliased(Item)
+    return (
+        select(VerseReference.item_id, VerseReference.translation, VerseReference.chapter, VerseReference.verse, book.id, book.text)
+        .join(ItemClosure, and_(ItemClosure.descendant_id == VerseReference.item_id, ItemClosure.depth == VERSE_BOOK_DEPTH))
+        .join(book, book.id == ItemClosure.ancestor_id)
+        .where(VerseReference.item_id.in_([hit.id for hit in hits]))
+        .order_by(VerseReference.item_id, VerseReference.chapter, VerseReference.verse)
+    )
+
+def set_verse_references(hits: list[ItemSearchHit], rows: list[Row]):
+    """Sets the references of the hits that are verses, written by the Bible's publication index settings"""
+    # An Item can hold a range of verses, such as "16-17"
+    verses = {} # type: dict[int, list]
+    for item_id, translation, chapter, verse, book_id, book_name in rows:
+        verses.setdefault(item_id, []).append((translation, chapter, verse, book_id, book_name))
+
+    for hit in hits:
+        if hit.id not in verses:
+            continue
+        first, last = verses[hit.id][0], verses[hit.id][-1]
+        translation, chapter, verse, book_id, book_name = first
+        hit.translation = translation
+        hit.reference = PublicationItemsIndex(
+            settings=indexSettings,
+            publication=book_name,
+            publication_ID=book_id,
+            ranges=[PublicationChapterSubchapterRange(
+                chapter_start=str(chapter), chapter_end=str(last[1]),
+                subchapter_start=verse_label(verse), subchapter_end=verse_label(last[2]),
+            )],
+        ).to_string()
+
+def search_query(dialect: str, query: str, limit: int, offset: int) -> Optional[tuple[TextClause, dict[str, Any]]]:
+    """The ranked query of a search and its parameters, or None if the search can't match anything"""
+    if dialect == "sqlite":
+        match = fts5_query(query)
+        if match == "":
+            return None
+        return text(
+            f"SELECT item.id, item.text, -bm25({ITEM_FTS_TABLE}) AS rank FROM {ITEM_FTS_TABLE} "
+            f"JOIN item ON item.id = {ITEM_FTS_TABLE}.rowid "
+            f"WHERE {ITEM_FTS_TABLE} MATCH :match ORDER BY rank DESC, item.id LIMIT :limit OFFSET :offset"
+        ), {"match": match, "limit": limit, "offset": offset}
+    elif dialect == "postgresql":
+        return text(
+            f"SELECT item.id, item.text, ts_rank({item_text_search_vector()}, query) AS rank "
+            f"FROM item, websearch_to_tsquery('{TEXT_SEARCH_CONFIGURATION}'::regconfig, :query) AS query "
+            f"WHERE {item_text_search_vector()} @@ query ORDER BY rank DESC, item.id LIMIT :limit OFFSET :offset"
+        ), {"query": query, "limit": limit, "offset": offset}
+    else:
+        raise NotImplementedError(f"no full-text search on {dialect}")
+
+def search_items(session: Session, query: str, limit: int = 20, offset: int = 0) -> list[ItemSearchHit]:
+    """Items whose text has all the words of a query, most relevant first, from the full-text index"""
+    search = search_query(session.get_bind().dialect.name, query, limit, offset)
+    if search is None:
+        return []
+
+    hits = [ItemSearchHit(id=item_id, text=item_text, rank=rank) for item_id, item_text, rank in session.connection().execute(*search)]
+    if len(hits) > 0:
+        set_verse_references(hits, session.exec(verse_references_query(hits)).all())
+    return hits
+
+async def search_items_async(session: AsyncSession, query: str, limit: int = 20, offset: int = 0) -> list[ItemSearchHit]:
+    search = search_query(session.get_bind().dialect.name, query, limit, offset)
+    if search is None:
+        return []
+
+    hits = [ItemSearchHit(id=item_id, text=item_text, rank=rank) for item_id, item_text, rank in await session.execute(*search)]
+    if len(hits) > 0:
+        set_verse_references(hits, (await session.exec(verse_references_query(hits))).all())
+    return hits
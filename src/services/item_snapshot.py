@@ -0,0 +1,89 @@
+from datetime import datetime
+import gzip
+from typing import Any, Iterable, Optional, Sequence
+
+from sqlalchemy import Table, delete, event, exists
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.item_closure import ItemClosure
+from src.models.item_snapshot import ItemSnapshot
+from src.services.item import get_item_subtree_version
+from src.services.item_bulk import insert_rows
+from src.services.item_cache import STALE_ITEM_IDS
+from src.services.item_stream import stream_item_subtree
+
+# Depths below a translation's root of the Items snapshotted by default
+BOOK_DEPTH = 1
+CHAPTER_DEPTH = 2
+SNAPSHOT_COMPRESSION_LEVEL = 6
+
+def item_snapshot_table() -> Table:
+    return ItemSnapshot.__table__
+
+def render_item_snapshots(session: Session, item_ids: Iterable[int]) -> list[dict[str, Any]]:
+    """Rows of the snapshots of Items, leaving out those that don't exist"""
+    built_at = datetime.utcnow()
+    rows = [] # type: list[dict[str, Any]]
+    for item_id in item_ids:
+        version = get_item_subtree_version(session, item_id)
+        if version is None:
+            continue
+        rows.append({
+            "item_id": item_id,
+            # Without a timestamp, the same subtree always compresses to the same bytes
+            "data": gzip.compress(b"".join(stream_item_subtree(session, item_id)), compresslevel=SNAPSHOT_COMPRESSION_LEVEL, mtime=0),
+            "etag": version.etag,
+            "updated_at": version.last_modified,
+            "built_at": built_at,
+        })
+    return rows
+
+def save_item_snapshots(session: Session, item_ids: list[int]) -> int:
+    """Renders the snapshots of Items, replacing those they have, returning how many were saved"""
+    if len(item_ids) == 0:
+        return 0
+    table = item_snapshot_table()
+    connection = session.connection()
+    rows = render_item_snapshots(session, item_ids)
+    connection.execute(delete(table).where(table.c.item_id.in_(item_ids)))
+    insert_rows(connection, table, rows)
+    return len(rows)
+
+def build_item_snapshots(session: Session, root_id: int, depths: Sequence[int] = (CHAPTER_DEPTH,), commit: bool = True) -> int:
+    """Snapshots the Items `depths` levels below an Item that don't have a snapshot yet, returning how many were built"""
+    item_ids = list(session.exec(
+        select(ItemClosure.descendant_id)
+        .where(ItemClosure.ancestor_id == root_id, ItemClosure.depth.in_(depths))
+        .where(~exists().where(ItemSnapshot.item_id == ItemClosure.descendant_id))
+        .distinct()
+    ))
+    built = save_item_snapshots(session, item_ids)
+    if commit:
+        session.commit()
+    return built
+
+def rebuild_item_snapshots(session: Session, item_ids: Iterable[int]) -> int:
+    """Renders again the snapshots of those of `item_ids` that have one"""
+    item_ids = list(item_ids)
+    if len(item_ids) == 0:
+        return 0
+    return save_item_snapshots(session, list(session.exec(select(ItemSnapshot.item_id).where(ItemSnapshot.item_id.in_(item_ids)))))
+
+# Ahead of the subtree cache's listener, which forgets the stale Items
+@event.listens_for(Session, "after_commit", insert=True)
+def rebuild_stale_snapshots(session: Session):
+    """Rebuilds the snapshots of the subtrees a transaction changed, in a transaction of their own once it has committed
+
+    Only sessions that changed Items have stale subtrees, so other commits
+    neither flush nor render anything here.
+    """
+    stale = session.info.get(STALE_ITEM_IDS)
+    if not stale:
+        return
+    with Session(session.get_bind()) as rebuild_session:
+        rebuild_item_snapshots(rebuild_session, stale)
+        rebuild_session.commit()
+
+async def get_item_snapshot_async(session: AsyncSession, item_id: int) -> Optional[ItemSnapshot]:
+    return await session.get(ItemSnapshot, item_id)
@@ -0,0 +1,106 @@
+import json
+from typing import AsyncGenerator, Generator, Optional
+
+from sqlalchemy import Select
+from sqlalchemy.engine import Row
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.item import Item, ItemChild
+from src.models.item_closure import ItemClosure
+
+# Rows fetched from the database at a time
+STREAM_BATCH_ROWS = 1000
+# Bytes of JSON collected before they're handed on
+STREAM_CHUNK_BYTES = 64 * 1024
+
+def item_subtree_rows_query(root_id: int) -> Select:
+    """The Items of a subtree in document order, each with its depth and the ItemChild linking it to its parent"""
+    return (
+        select(
+            ItemClosure.depth,
+            Item.id,
+            Item.text,
+            Item.children_display_class,
+            ItemChild.id,
+            ItemChild.local_index,
+            ItemChild.label,
+        )
+        .join(Item, Item.id == ItemClosure.descendant_id)
+        .outerjoin(ItemChild, ItemChild.id == ItemClosure.item_child_id)
+        .where(ItemClosure.ancestor_id == root_id)
+        .order_by(ItemClosure.sort_key)
+        .execution_options(yield_per=STREAM_BATCH_ROWS)
+    )
+
+class ItemSubtreeJSONWriter:
+    """Writes the rows of `item_subtree_rows_query` as the nested JSON of `serialize_item_subtree`
+
+    As rows come in document order, each one either opens a child of the
+    last Item written or follows it once the Items deeper than it are closed,
+    so only the path to the current Item is kept. The JSON is handed out in
+    chunks of about `STREAM_CHUNK_BYTES`.
+    """
+    def __init__(self):
+        # For each open Item, whether it has had a child written yet
+        self.open = [] # type: list[bool]
+        self.parts = [] # type: list[str]
+        self.size = 0
+
+    def add(self, row: Row) -> Optional[bytes]:
+        """Writes a row, returning a chunk of JSON once enough has been written"""
+        depth, item_id, text, children_display_class, item_child_id, local_index, label = row
+        self.close(depth)
+        if depth > 0:
+            if self.open[-1]:
+                self.write(", ")
+            self.open[-1] = True
+            self.write(f'{{"id": {json.dumps(item_child_id)}, "local_index": {json.dumps(local_index)}, "label": {json.dumps(label)}, "child": ')
+        self.write(f'{{"id": {json.dumps(item_id)}, "text": {json.dumps(text)}, "children_display_class": {json.dumps(children_display_class.name)}, "children": [')
+        self.open.append(False)
+        return self.flush() if self.size >= STREAM_CHUNK_BYTES else None
+
+    def write(self, part: str):
+        self.parts.append(part)
+        self.size += len(part)
+
+    def close(self, depth: int):
+        """Ends the Items at `depth` or deeper"""
+        while len(self.open) > depth:
+            self.open.pop()
+            self.write("]}}" if len(self.open) > 0 else "]}")
+
+    def flush(self) -> bytes:
+        chunk = "".join(self.parts).encode('utf-8')
+        self.parts = []
+        self.size = 0
+        return chunk
+
+    def finish(self) -> Optional[bytes]:
+        """Ends the JSON, returning what's left of it, or None if nothing was written"""
+        self.close(0)
+        return self.flush() if self.size > 0 else None
+
+def stream_item_subtree(session: Session, root_id: int) -> Generator[bytes, None, None]:
+    """Yields an Item's subtree as JSON while it's read, so memory doesn't grow with the size of the subtree
+
+    Nothing is yielded if there's no such Item.
+    """
+    writer = ItemSubtreeJSONWriter()
+    for row in session.exec(item_subtree_rows_query(root_id)):
+        chunk = writer.add(row)
+        if chunk is not None:
+            yield chunk
+    chunk = writer.finish()
+    if chunk is not None:
+        yield chunk
+
+async def stream_item_subtree_async(session: AsyncSession, root_id: int) -> AsyncGenerator[bytes, None]:
+    writer = ItemSubtreeJSONWriter()
+    async for row in await session.stream(item_subtree_rows_query(root_id)):
+        chunk = writer.add(row)
+        if chunk is not None:
+            yield chunk
+    chunk = writer.finish()
+    if chunk is not None:
+        yield chunk
@@ -0,0 +1,132 @@
+from dataclasses import dataclass, field
+import os
+from typing import AsyncGenerator, Generator, Optional
+
+from sqlalchemy import Select, delete, tuple_
+from sqlalchemy.engine import Row
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.Bible.versification import Versification
+from src.models.item import Item
+from src.models.item_import import ItemImportSource
+from src.models.verse_reference import VerseAlignment, VerseReference
+from src.services.item_bulk import insert_rows
+from src.services.verse_reference import VerseRange, book_code, index_book_verses
+
+# Where translations are imported from, each in a directory named after it
+TRANSLATIONS_DIRECTORY = "content/Bible"
+
+@dataclass
+class ParallelItem:
+    id: int
+    text: str | None
+
+@dataclass
+class ParallelVerse:
+    """A canonical verse with the Items of each translation at it"""
+    book: str
+    chapter: int
+    verse: int
+    translations: dict[str, list[ParallelItem]] = field(default_factory=dict)
+
+def delete_book_alignments(session: Session, translation: str, book: str):
+    """Deletes the alignments of a book's verses, which have to still be referenced"""
+    session.connection().execute(delete(VerseAlignment).where(
+        VerseAlignment.translation == translation,
+        VerseAlignment.item_id.in_(select(VerseReference.item_id).where(VerseReference.translation == translation, VerseReference.book == book)),
+    ))
+
+def align_book_verses(session: Session, translation: str, book: str, versification: Versification) -> int:
+    """Aligns the referenced verses of a book onto canonical verses, returning how many alignments there are"""
+    delete_book_alignments(session, translation, book)
+
+    verses = session.exec(
+        select(VerseReference.chapter, VerseReference.verse, VerseReference.item_id)
+        .where(VerseReference.translation == translation, VerseReference.book == book)
+        .order_by(VerseReference.chapter, VerseReference.verse, VerseReference.part)
+    ).all()
+
+    parts = {} # type: dict[tuple[str, int, int], int]
+    alignments = [] # type: list[dict]
+    for chapter, verse, item_id in verses:
+        for canonical in versification.canonical(book, chapter, verse):
+            part = parts.get(canonical, 0)
+            parts[canonical] = part + 1
+            canonical_book, canonical_chapter, canonical_verse = canonical
+            alignments.append({
+                "book": canonical_book, "chapter": canonical_chapter, "verse": canonical_verse,
+                "translation": translation, "part": part, "item_id": item_id,
+            })
+
+    insert_rows(session.connection(), VerseAlignment.__table__, alignments)
+    return len(alignments)
+
+def reindex_book_verses(session: Session, item_ids: set[int]) -> int:
+    """Indexes and aligns again the verses of the imported books among `item_ids`, returning how many there were
+
+    For edits outside imports, which may remove, move or relabel verse Items.
+    The versification is read from the translation's directory under
+    `TRANSLATIONS_DIRECTORY`.
+    """
+    if len(item_ids) == 0:
+        return 0
+    books = session.connection().execute(
+        select(ItemImportSource.translation, ItemImportSource.filename, ItemImportSource.item_id).where(ItemImportSource.item_id.in_(item_ids))
+    ).all()
+
+    versifications = {} # type: dict[str, Versification]
+    for translation, filename, book_item_id in books:
+        if translation not in versifications:
+            versifications[translation] = Versification.read(os.path.join(TRANSLATIONS_DIRECTORY, translation))
+        # Alignments are found through the references they were made from
+        delete_book_alignments(session, translation, book_code(filename))
+        index_book_verses(session, translation, book_code(filename), book_item_id)
+        align_book_verses(session, translation, book_code(filename), versifications[translation])
+    return len(books)
+
+def parallel_verses_query(translations: list[str], verse_range: VerseRange) -> Select:
+    return (
+        select(VerseAlignment.chapter, VerseAlignment.verse, VerseAlignment.translation, Item.id, Item.text)
+        .join(Item, Item.id == VerseAlignment.item_id)
+        .where(
+            VerseAlignment.book == verse_range.book,
+            VerseAlignment.chapter.between(verse_range.start_chapter, verse_range.end_chapter),
+            tuple_(VerseAlignment.chapter, VerseAlignment.verse) >= (verse_range.start_chapter, verse_range.start_verse),
+            tuple_(VerseAlignment.chapter, VerseAlignment.verse) <= (verse_range.end_chapter, verse_range.end_verse),
+            VerseAlignment.translation.in_(translations),
+        )
+        .order_by(VerseAlignment.chapter, VerseAlignment.verse, VerseAlignment.translation, VerseAlignment.part)
+        .execution_options(yield_per=256)
+    )
+
+def add_parallel_row(verse: Optional[ParallelVerse], row: Row, translations: list[str], verse_range: VerseRange) -> tuple[ParallelVerse, Optional[ParallelVerse]]:
+    """Adds a row of `parallel_verses_query` to the verse it's at, returning that verse and the one before it if it's finished"""
+    chapter, verse_number, translation, item_id, text = row
+    finished = None # type: Optional[ParallelVerse]
+    if verse is None or (verse.chapter, verse.verse) != (chapter, verse_number):
+        finished = verse
+        verse = ParallelVerse(book=verse_range.book, chapter=chapter, verse=verse_number, translations={ name: [] for name in translations })
+    verse.translations[translation].append(ParallelItem(id=item_id, text=text))
+    return verse, finished
+
+def parallel_verses(session: Session, translations: list[str], verse_range: VerseRange) -> Generator[ParallelVerse, None, None]:
+    """Yields each canonical verse of a range with the Items of the given translations, from one query read as it goes"""
+    verse = None # type: Optional[ParallelVerse]
+    for row in session.exec(parallel_verses_query(translations, verse_range)):
+        verse, finished = add_parallel_row(verse, row, translations, verse_range)
+        if finished is not None:
+            yield finished
+
+    if verse is not None:
+        yield verse
+
+async def parallel_verses_async(session: AsyncSession, translations: list[str], verse_range: VerseRange) -> AsyncGenerator[ParallelVerse, None]:
+    verse = None # type: Optional[ParallelVerse]
+    async for row in await session.stream(parallel_verses_query(translations, verse_range)):
+        verse, finished = add_parallel_row(verse, row, translations, verse_range)
+        if finished is not None:
+            yield finished
+
+    if verse is not None:
+        yield verse
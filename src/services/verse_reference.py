@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+import re
+
+from sqlalchemy import delete, tuple_
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+
+from src.Bible.usfm import DESCRIPTIVE_TITLE_LABEL
+from src.models.item import ItemChild
+from src.models.verse_reference import SUPERSCRIPT_VERSE, VerseReference
+from src.services.item_bulk import insert_rows
+
+LAST_VERSE = 2 ** 31 - 1
+# Verse Items are under paragraphs, under chapters, under books
+VERSE_BOOK_DEPTH = 3
+
+_REFERENCE = re.compile(r'^\s*(\w+)\s+(\d+)(?::(\d+))?(?:\s*-\s*(\d+)(?::(\d+))?)?\s*$')
+
+@dataclass(frozen=True)
+class VerseRange:
+    """Verses of a book from `start_chapter`:`start_verse` to `end_chapter`:`end_verse`, inclusive"""
+    book: str
+    start_chapter: int
+    start_verse: int
+    end_chapter: int
+    end_verse: int
+
+    @staticmethod
+    def parse(reference: str) -> "VerseRange":
+        """Parses references such as "JHN 3:16", "JHN 3:16-18", "JHN 3:16-4:2", "JHN 3" and "JHN 3-4"
+
+        Books are USFM book codes. Raises a ValueError for anything else.
+        """
+        match = _REFERENCE.match(reference)
+        if match is None:
+            raise ValueError(f"not a verse reference: {reference!r}")
+        book, start_chapter, start_verse, end, end_verse = match.groups()
+
+        start_chapter = int(start_chapter)
+        if end is None:
+            end_chapter = start_chapter
+            end_verse = int(start_verse) if start_verse is not None else LAST_VERSE
+        elif end_verse is not None:
+            end_chapter = int(end)
+            end_verse = int(end_verse)
+        elif start_verse is not None:
+            # "3:16-18" continues in the same chapter
+            end_chapter = start_chapter
+            end_verse = int(end)
+        else:
+            end_chapter = int(end)
+            end_verse = LAST_VERSE
+
+        return VerseRange(
+            book=book.upper(),
+            start_chapter=start_chapter,
+            start_verse=int(start_verse) if start_verse is not None else SUPERSCRIPT_VERSE,
+            end_chapter=end_chapter,
+            end_verse=end_verse,
+        )
+
+def resolve_verse_range(session: Session, translation: str, verse_range: VerseRange) -> list[int]:
+    """Ids of the verse Items of a range in reading order, from one query on the covering index"""
+    return list(session.exec(
+        select(VerseReference.item_id).where(
+            VerseReference.translation == translation,
+            VerseReference.book == verse_range.book,
+            VerseReference.chapter.between(verse_range.start_chapter, verse_range.end_chapter),
+            tuple_(VerseReference.chapter, VerseReference.verse) >= (verse_range.start_chapter, verse_range.start_verse),
+            tuple_(VerseReference.chapter, VerseReference.verse) <= (verse_range.end_chapter, verse_range.end_verse),
+        ).order_by(VerseReference.chapter, VerseReference.verse, VerseReference.part)
+    ).all())
+
+def resolve_verse(session: Session, translation: str, book: str, chapter: int, verse: int) -> list[int]:
+    """Ids of the Items of a verse, one for each paragraph it spans"""
+    return resolve_verse_range(session, translation, VerseRange(book=book, start_chapter=chapter, start_verse=verse, end_chapter=chapter, end_verse=verse))
+
+def resolve_reference(session: Session, translation: str, reference: str) -> list[int]:
+    return resolve_verse_range(session, translation, VerseRange.parse(reference))
+
+def verse_numbers(label: str) -> list[int]:
+    """The verses a verse label stands for, e.g. [16] for "16" and [16, 17] for "16-17" """
+    if label == DESCRIPTIVE_TITLE_LABEL:
+        return [SUPERSCRIPT_VERSE]
+    start, _, end = label.partition("-")
+    if not start.isdigit() or not (end == "" or end.isdigit()):
+        return []
+    return list(range(int(start), int(end or start) + 1))
+
+def book_code(filename: str) -> str:
+    """The book code of a book file laid out as `<number>-<book code><language>-<translation>.usfm`"""
+    return filename[3:6]
+
+def delete_book_verses(session: Session, translation: str, book: str):
+    session.connection().execute(delete(VerseReference).where(VerseReference.translation == translation, VerseReference.book == book))
+
+def index_book_verses(session: Session, translation: str, book: str, book_item_id: int) -> int:
+    """Replaces the references to the verses of a saved book (book, chapter, paragraph, verse Items), returning how many there are"""
+    delete_book_verses(session, translation, book)
+
+    chapter_link = aliased(ItemChild)
+    paragraph_link = aliased(ItemChild)
+    verse_link = aliased(ItemChild)
+
+    verses = session.exec(
+        select(chapter_link.label, verse_link.label, verse_link.child_id)
+        .join(paragraph_link, paragraph_link.parent_id == chapter_link.child_id)
+        .join(verse_link, verse_link.parent_id == paragraph_link.child_id)
+        .where(chapter_link.parent_id == book_item_id)
+        .order_by(chapter_link.local_index, paragraph_link.local_index, verse_link.local_index)
+    ).all()
+
+    parts = {} # type: dict[tuple[int, int], int]
+    references = [] # type: list[dict]
+    for chapter_label, verse_label, item_id in verses:
+        if chapter_label is None or not chapter_label.isdigit() or verse_label is None:
+            continue
+        chapter = int(chapter_label)
+        for verse in verse_numbers(verse_label):
+            part = parts.get((chapter, verse), 0)
+            parts[(chapter, verse)] = part + 1
+            references.append({ "translation": translation, "book": book, "chapter": chapter, "verse": verse, "part": part, "item_id": item_id })
+
+    insert_rows(session.connection(), VerseReference.__table__, references)
+    return len(references)
@@ -0,0 +1,69 @@
+import sys
+
+from sqlalchemy import event, func
+from sqlmodel import select
+
+from src.ai.discourse.discourse import CommunicationRole, DiscourseFeatures, DiscourseMember, DiscourseType, Person
+from src.ai.discourse.ingestor import BackingDiscourseChunkIngestor, DiscourseIngestor
+from src.ai.discourse.item_intaker import ItemIntaker
+from src.Bible.index_settings import indexSettings
+from src.db.database import engine, get_session
+from src.models.item import Item, ItemChild
+from src.models.item_closure import ItemClosure
+from src.models.item_ref import ItemRef
+from src.publications.publication_items import PublicationItemsIndexer
+from src.services.item import load_item_subtree
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(engine, "before_cursor_execute", self.count)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(engine, "before_cursor_execute", self.count)
+
+    def count(self, *args):
+        self.queries += 1
+
+def intake(book: Item, book_id: int) -> int:
+    """Ingests a book, returning how many chunks it made"""
+    features = DiscourseFeatures(types=[DiscourseType.BOOK], members=[DiscourseMember(roles=[CommunicationRole.WRITER], person=Person(name="writer", desc="writer of the book"))])
+    backing = BackingDiscourseChunkIngestor(features=features, new_chunk_receiver=None)
+    intaker = ItemIntaker(
+        item_indexer=PublicationItemsIndexer(settings=indexSettings),
+        discourse_ingestor=DiscourseIngestor(discourse_features=features, ingestors=[backing]),
+    )
+    intaker.intake(book, ItemRef(root=book_id))
+    return len(backing.discourse.chunks)
+
+def main(book_id: int):
+    """Checks that ingesting a preloaded book costs a few queries, where walking it lazily costs one per Item"""
+    with get_session() as session:
+        depth = session.exec(select(func.max(ItemClosure.depth)).where(ItemClosure.ancestor_id == book_id)).one()
+        items = session.exec(select(func.count()).select_from(ItemClosure).where(ItemClosure.ancestor_id == book_id)).one()
+
+    with get_session() as session, QueryCounter() as lazy:
+        lazy_chunks = intake(session.get(Item, book_id), book_id)
+
+    with get_session() as session, QueryCounter() as loaded:
+        loaded_chunks = intake(load_item_subtree(session, book_id), book_id)
+
+    print(f"Book {book_id}: {items} items, {depth} levels deep")
+    print(f"Walking lazily: {lazy.queries} queries, {lazy_chunks} chunks")
+    print(f"Preloaded: {loaded.queries} queries, {loaded_chunks} chunks")
+
+    assert loaded_chunks == lazy_chunks
+    # Loading the subtree, and the book's name for the index
+    assert loaded.queries <= depth + 2, f"{loaded.queries} queries for a tree {depth} levels deep"
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        with get_session() as session:
+            # The first book of the first Bible
+            book_id = session.exec(select(ItemChild.child_id).order_by(ItemChild.parent_id, ItemChild.local_index).limit(1)).one()
+        main(book_id)
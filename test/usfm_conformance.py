@@ -0,0 +1,100 @@
+from itertools import zip_longest
+import os
+import sys
+import time
+from typing import Generator, Optional
+
+from src.Bible.usfm import USFMEvent, USFMEventKind, USFMMarkerContents, USFMParseError, USFMParser
+from test import usfm_reference
+
+DIRECTORY = "content/Bible/ASV"
+
+def compare(expected: Optional[list[usfm_reference.USFMMarkerContents]], actual: Optional[list[USFMMarkerContents]], path: str) -> Optional[str]:
+    if expected is None or actual is None:
+        return None if expected is actual else f"{path}: descendants {expected is None} != {actual is None}"
+
+    if len(expected) != len(actual):
+        return f"{path}: {len(expected)} != {len(actual)} markers"
+
+    for i, (expected_content, actual_content) in enumerate(zip(expected, actual)):
+        content_path = f"{path}/{i}:{expected_content.name}"
+        for field in ["name", "level", "number", "text", "nested", "attributes"]:
+            if getattr(expected_content, field) != getattr(actual_content, field):
+                return f"{content_path}: {field} {getattr(expected_content, field)!r} != {getattr(actual_content, field)!r}"
+
+        difference = compare(expected_content.descendants, actual_content.descendants, content_path)
+        if difference is not None:
+            return difference
+
+    return None
+
+def contents_events(contents: list[usfm_reference.USFMMarkerContents]) -> Generator[USFMEvent, None, None]:
+    for content in contents:
+        if content.name is None and content.number is None and content.descendants is None and content.attributes is None:
+            yield USFMEvent(kind=USFMEventKind.TEXT, text=content.text)
+            continue
+
+        yield USFMEvent(kind=USFMEventKind.START, name=content.name, level=content.level, number=content.number, nested=content.nested, text=content.text)
+        if content.descendants is not None:
+            yield from contents_events(content.descendants)
+        if content.attributes is not None:
+            for name, value in content.attributes.items():
+                yield USFMEvent(kind=USFMEventKind.ATTRIBUTE, name=name, text=value)
+        yield USFMEvent(kind=USFMEventKind.END, name=content.name)
+
+def compare_events(expected: list[usfm_reference.USFMMarkerContents], text: str, parser: USFMParser) -> Optional[str]:
+    for i, (expected_event, actual_event) in enumerate(zip_longest(contents_events(expected), parser.events(text))):
+        if expected_event != actual_event:
+            return f"event {i}: {expected_event} != {actual_event}"
+    return None
+
+def main():
+    parser = USFMParser()
+    failures = 0
+    time_reference = 0.0
+    time_table = 0.0
+
+    for filename in sorted(os.listdir(DIRECTORY)):
+        if not filename.endswith(".usfm"):
+            continue
+
+        with open(os.path.join(DIRECTORY, filename), 'r', encoding='utf-8') as file:
+            text = file.read()
+
+        start = time.perf_counter()
+        try:
+            expected = usfm_reference.parse_USFM(text)
+        except NotImplementedError:
+            expected = None
+        time_reference += time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            actual = parser.parse(text)
+        except USFMParseError:
+            actual = None
+        time_table += time.perf_counter() - start
+
+        if expected is None or actual is None:
+            difference = None if expected is actual else f"raised {expected is None} != {actual is None}"
+            status = "unsupported" if difference is None else "FAILED"
+        else:
+            difference = compare(expected, actual, "")
+            if difference is None:
+                difference = compare_events(expected, text, parser)
+            status = "ok" if difference is None else "FAILED"
+
+        if difference is not None:
+            failures += 1
+            print(f"{filename}: {status}: {difference}")
+        else:
+            print(f"{filename}: {status}")
+
+    print(f"reference: {time_reference:.2f}s, table: {time_table:.2f}s")
+
+    if failures > 0:
+        print(f"{failures} books differ")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()